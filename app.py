@@ -1,56 +1,373 @@
+import time
 
+# Laufzeit je Skriptdurchlauf (Streamlit führt app.py bei jeder Interaktion neu aus)
+_DURCHLAUF_START = time.perf_counter()
+
+import json
+import os
+import uuid
 import streamlit as st
 import pandas as pd
-from utils.logic import berechne_provisionen
-from utils.pdf_generator import exportiere_pdfs_in_memory
-from io import BytesIO
-from zipfile import ZipFile
+from contextlib import nullcontext
+from utils.cache import LRUCache, frame_bytes, inhalt_hash, lade_provisionen
+from utils.ergebnis import fuer_anzeige, kompaktiere
+from utils.exportauftrag import export_auftrag, starte_export
+from utils.instrumentation import aktiviere_json_log, logger, mit_messung
+from utils.journal import Abrechnungsjournal
+from utils.logic import berechne_provisionen, vergleiche_szenarien
+from utils.pdf_ablage import PdfAblage
+from utils.pdf_generator import exportiere_zip, mitarbeiter_pdf, pdf_dateiname
+from utils.szenarien import einheitliche_saetze
+
+# nur beim ersten Durchlauf im Prozess spürbar, danach aus sys.modules;
+# reportlab und openpyxl werden erst bei der ersten Nutzung geladen
+_IMPORT_SEKUNDEN = time.perf_counter() - _DURCHLAUF_START
+
+# Obergrenze für zwischengespeicherte Ergebnisse je Session
+SESSION_MAX_ERGEBNISSE = 4
+SESSION_MAX_BYTES = 128 * 1024 * 1024
+
+# Lokales Journal bereits abgerechneter Provisionen
+JOURNAL_PFAD = os.environ.get("PROVISIONSTOOL_JOURNAL", "provisionen_journal.sqlite")
+
+# Ablage deterministisch erzeugter PDFs (unveränderte Mitarbeiter werden übernommen)
+PDF_ABLAGE_PFAD = os.environ.get("PROVISIONSTOOL_PDF_ABLAGE", "pdf_ablage")
 
 st.set_page_config(page_title="Provisionstool", layout="wide")
 st.title("🧾 Provisionstool für Mitarbeiter")
 
-rechnungsdatei = st.file_uploader("📂 Rechnungsdatei (CSV oder Excel)", type=["csv", "xlsx"])
+rechnungsdateien = st.file_uploader(
+    "📂 Rechnungsdatei(en) (CSV oder Excel, z. B. je Filiale/Monat)",
+    type=["csv", "xlsx"],
+    accept_multiple_files=True,
+)
+# mehrere Dateien werden parallel eingelesen, zusammengeführt und nach
+# Rechnungsnummer dedupliziert (neuester Stand gewinnt)
+rechnungsdatei = (
+    rechnungsdateien[0] if len(rechnungsdateien or []) == 1 else (rechnungsdateien or None)
+)
 provisionsdatei = st.file_uploader("📂 Provisionssätze je Mitarbeiter (Excel)", type=["xlsx"])
 monate_rueckblick = st.slider("Zeitraum in Monaten (nur bezahlte Rechnungen ab)", min_value=1, max_value=12, value=1)
 
 if "provision_df" not in st.session_state:
     st.session_state.provision_df = None
+if "live_berechnung" not in st.session_state:
+    st.session_state.live_berechnung = False
+if "ergebnisse" not in st.session_state:
+    st.session_state.ergebnisse = LRUCache(
+        max_eintraege=SESSION_MAX_ERGEBNISSE, max_bytes=SESSION_MAX_BYTES
+    )
+if "messprotokolle" not in st.session_state:
+    st.session_state.messprotokolle = {}
+if "journal_stand" not in st.session_state:
+    st.session_state.journal_stand = 0
+if "ablage_kontext" not in st.session_state:
+    st.session_state.ablage_kontext = "standard"
+if "sitzung" not in st.session_state:
+    # Besitzer der Exportaufträge dieser Session (steht nicht in der URL)
+    st.session_state.sitzung = uuid.uuid4().hex
+
+journal_aktiv = st.checkbox(
+    "📒 Bereits abgerechnete Rechnungen ausblenden (Abrechnungsjournal)", value=False
+)
+
+
+@st.cache_resource
+def _journal(pfad):
+    """Journal einmal je Prozess öffnen (Schema-Prüfung nicht bei jedem Rerun)."""
+    return Abrechnungsjournal(pfad)
+
+
+@st.cache_resource
+def _prozess_laufzeiten():
+    """Über alle Sessions geteilt: Kaltstart = erster Durchlauf im Prozess."""
+    return {}
+
+
+journal = _journal(JOURNAL_PFAD) if journal_aktiv else None
+
+messung_aktiv = st.sidebar.checkbox("⏱️ Messwerte anzeigen (Laufzeit/Speicher je Stufe)", value=False)
+if messung_aktiv:
+    aktiviere_json_log()
+
+
+def _messung():
+    """Messprotokoll für einen Ablauf (nur wenn in der Sidebar aktiviert)."""
+    return mit_messung() if messung_aktiv else nullcontext()
+
 
 if st.button("✅ Provisionen berechnen"):
     if not rechnungsdatei or not provisionsdatei:
         st.error("Bitte beide Dateien hochladen.")
     else:
-        df_provision = berechne_provisionen(rechnungsdatei, provisionsdatei, monate_rueckblick)
-        if df_provision.empty:
-            st.warning("Keine relevanten Rechnungen für diesen Zeitraum gefunden.")
-        else:
-            st.session_state.provision_df = df_provision
-            st.success("Provisionen erfolgreich berechnet.")
-            st.dataframe(df_provision)
+        st.session_state.live_berechnung = True
+
+# Nach der ersten Berechnung wird bei jeder Slider-Änderung live neu berechnet:
+# die eingelesenen Tabellen kommen aus dem Cache, der Zeitraum ist nur ein Slice.
+# Ergebnisse liegen kompakt (Kategorien) in einem begrenzten Session-Cache;
+# ältere Zeiträume/Dateien werden bei Überschreitung verdrängt.
+if st.session_state.live_berechnung and rechnungsdatei and provisionsdatei:
+    ergebnis_key = (
+        tuple(getattr(d, "file_id", None) or inhalt_hash(d) for d in rechnungsdateien),
+        getattr(provisionsdatei, "file_id", None) or inhalt_hash(provisionsdatei),
+        monate_rueckblick,
+        # nach jeder Verbuchung neu abgleichen
+        st.session_state.journal_stand if journal_aktiv else None,
+    )
+    eintrag = st.session_state.ergebnisse.get(ergebnis_key)
+    if eintrag is None:
+        parsefehler = []
+        with _messung() as protokoll:
+            df_provision = kompaktiere(
+                berechne_provisionen(
+                    rechnungsdatei, provisionsdatei, monate_rueckblick,
+                    cache=True, journal=journal, fehler=parsefehler,
+                )
+            )
+        if protokoll is not None:
+            st.session_state.messprotokolle["Berechnung"] = protokoll
+        # Vergleichsbasis der PDF-Ablage: gleiche Rechnungsdateien (Inhalt, nicht
+        # Upload-ID) und gleicher Zeitraum; geänderte Sätze erscheinen so als
+        # „geaendert“, andere Datenstände/Nutzer haben eine eigene Basis
+        ablage_kontext = "app-{}-{}m".format(
+            "-".join(inhalt_hash(d)[:12] for d in rechnungsdateien), monate_rueckblick
+        )
+        eintrag = (df_provision, parsefehler, ablage_kontext)
+        st.session_state.ergebnisse.put(ergebnis_key, eintrag, frame_bytes(df_provision))
+    df_provision, parsefehler, ablage_kontext = eintrag
+
+    # nicht lesbare Beträge/Datumswerte melden statt still als 0 bzw. leer zu werten
+    if parsefehler:
+        st.warning(
+            f"⚠️ {len(parsefehler)} Wert(e) in der Rechnungsdatei konnten nicht gelesen werden "
+            "(Betrag als 0 €, Datum als leer gewertet)."
+        )
+        st.dataframe(pd.DataFrame(parsefehler), hide_index=True)
+
+    if df_provision.empty:
+        st.session_state.provision_df = None
+        st.warning("Keine relevanten Rechnungen für diesen Zeitraum gefunden.")
+    else:
+        st.session_state.provision_df = df_provision
+        st.session_state.ablage_kontext = ablage_kontext
+        st.success("Provisionen erfolgreich berechnet.")
+        st.dataframe(fuer_anzeige(df_provision))
+
+    # Was-wäre-wenn: mehrere Satztabellen auf denselben eingelesenen Rechnungen
+    with st.expander("🔀 Szenarien vergleichen (Auszahlung je Mitarbeiter)"):
+        einheitlich = st.data_editor(
+            pd.DataFrame({"Szenario": ["Szenario 1"], "Eigenleistung": [3.0], "Fremdleistung": [1.5]}),
+            num_rows="dynamic",
+            hide_index=True,
+            key="szenarien_einheitlich",
+        )
+        szenario_dateien = st.file_uploader(
+            "Weitere Provisionstabellen (Excel)", type=["xlsx"], accept_multiple_files=True
+        )
+        if st.button("🔀 Szenarien berechnen"):
+            basis = lade_provisionen(provisionsdatei)
+            szenarien = {
+                zeile["Szenario"]: einheitliche_saetze(
+                    basis, zeile["Eigenleistung"], zeile["Fremdleistung"]
+                )
+                for zeile in einheitlich.dropna(subset=["Szenario"]).to_dict("records")
+            }
+            for datei in szenario_dateien or []:
+                szenarien[datei.name] = lade_provisionen(datei)
+
+            with _messung() as protokoll:
+                vergleich = vergleiche_szenarien(
+                    rechnungsdatei, provisionsdatei, szenarien, monate_rueckblick
+                )
+            if protokoll is not None:
+                st.session_state.messprotokolle["Szenarien"] = protokoll
+
+            summe = vergleich.drop(columns="Mitarbeiter").sum()
+            vergleich.loc[len(vergleich)] = {"Mitarbeiter": "Summe", **summe.to_dict()}
+            st.dataframe(vergleich, hide_index=True)
 
 # Unabhängiger PDF-Export-Button
 if st.session_state.provision_df is not None:
     st.markdown("---")
     st.subheader("📤 PDF-Erzeugung")
+    # Einzelne Abrechnung bei Bedarf rendern; landet im PDF-Cache und wird
+    # vom ZIP-Export wiederverwendet, solange sich die Zeilen nicht ändern
+    vorschau_mitarbeiter = st.selectbox(
+        "🔍 Vorschau für Mitarbeiter",
+        sorted(st.session_state.provision_df["Mitarbeiter"].dropna().unique(), key=str),
+        index=None,
+        placeholder="Mitarbeiter wählen …",
+    )
+    if vorschau_mitarbeiter is not None:
+        try:
+            pdf_bytes = mitarbeiter_pdf(st.session_state.provision_df, vorschau_mitarbeiter)
+        except Exception as e:
+            st.error(f"❌ Fehler bei PDF für {vorschau_mitarbeiter}: {e}")
+        else:
+            st.pdf(pdf_bytes, height=700)
+            st.download_button(
+                label="📥 Dieses PDF herunterladen",
+                data=pdf_bytes,
+                file_name=pdf_dateiname(vorschau_mitarbeiter),
+                mime="application/pdf",
+            )
+
+    parallel_rendern = st.checkbox("PDFs parallel erzeugen (mehrere Prozesse)", value=False)
+    ablage_aktiv = st.checkbox(
+        "♻️ Unveränderte Abrechnungen wiederverwenden (PDF-Ablage, mit Änderungsliste)",
+        value=False,
+    )
     if st.button("📥 ZIP mit allen Mitarbeiter-PDFs herunterladen"):
-        pdf_dateien = exportiere_pdfs_in_memory(st.session_state.provision_df)
+        ablage_optionen = {}
+        if ablage_aktiv:
+            ablage_optionen = {
+                "ablage": PdfAblage(PDF_ABLAGE_PFAD),
+                "provisionen": lade_provisionen(provisionsdatei) if provisionsdatei else None,
+                "kontext": st.session_state.ablage_kontext,
+            }
+        # PDFs werden im Hintergrund einzeln direkt ins ZIP geschrieben; die
+        # Auftrags-ID steht in der URL, gehört aber nur dieser Session
+        auftrag = starte_export(
+            st.session_state.provision_df, st.session_state.sitzung,
+            messung=messung_aktiv, parallel=parallel_rendern, **ablage_optionen,
+        )
+        st.query_params["export"] = auftrag.id
+
+    if journal_aktiv:
+        if st.button("📒 Bezahlte Rechnungen als abgerechnet verbuchen"):
+            try:
+                lauf_id = journal.verbuche(
+                    st.session_state.provision_df,
+                    bezeichnung=f"{monate_rueckblick} Monat(e) Rückblick",
+                )
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                if lauf_id is None:
+                    st.info("Keine bezahlten Rechnungen zu verbuchen.")
+                else:
+                    st.session_state.journal_stand += 1
+                    st.success(f"Lauf {lauf_id} im Journal verbucht.")
+
+# Laufender bzw. fertiger Export dieser Session (überlebt Reruns)
+auftrag = export_auftrag(st.query_params.get("export"), st.session_state.sitzung)
+if auftrag is None and "export" in st.query_params:
+    # fremder, verdrängter oder aus einer früheren Session stammender Auftrag
+    del st.query_params["export"]
+
+
+@st.fragment(run_every=1.0)
+def _export_fortschritt(auftrag):
+    """Fortschritt jede Sekunde aktualisieren, ohne die ganze Seite neu zu rechnen."""
+    if not auftrag.laeuft:
+        st.rerun()
+    st.progress(
+        auftrag.anteil,
+        text=f"PDF {auftrag.fertig}/{auftrag.gesamt}"
+        + (f": {auftrag.aktuell}" if auftrag.aktuell is not None else ""),
+    )
+
+
+if auftrag is not None:
+    st.markdown("---")
+    st.subheader("📦 ZIP-Export")
+    if auftrag.laeuft:
+        _export_fortschritt(auftrag)
+    else:
+        try:
+            zip_datei, pdf_inhalt = auftrag.ergebnis()
+        except Exception as e:
+            st.error(f"❌ Export abgebrochen: {e}")
+            pdf_inhalt = []
+        if auftrag.protokoll is not None:
+            st.session_state.messprotokolle["PDF/ZIP-Export"] = auftrag.protokoll
+        for mitarbeiter, meldung in auftrag.fehler:
+            st.error(f"❌ Fehler bei PDF für {mitarbeiter}: {meldung}")
+
+        if auftrag.manifest:
+            manifest = pd.DataFrame(auftrag.manifest)
+            anzahl = manifest["status"].value_counts()
+            st.info(
+                "Gegenüber dem letzten Export: "
+                + ", ".join(f"{anzahl.get(status, 0)} {status}" for status in
+                            ["geaendert", "neu", "unveraendert", "entfallen", "fehler"])
+                + f" – {int(manifest['neu_erzeugt'].sum())} PDF(s) neu erzeugt"
+            )
+            geaendert = manifest[manifest["status"] != "unveraendert"]
+            if not geaendert.empty:
+                st.dataframe(geaendert[["mitarbeiter", "status", "datei"]], hide_index=True)
 
-        st.info(f"DEBUG: Anzahl erzeugter PDF-Dateien: {len(pdf_dateien)}")
-        for name, pdf in pdf_dateien:
-            st.text(f"{name}: {len(pdf.getvalue())} Bytes")
+        if messung_aktiv and pdf_inhalt:
+            with st.expander(f"⏱️ {len(pdf_inhalt)} PDF-Datei(en) im ZIP"):
+                st.dataframe(pd.DataFrame(pdf_inhalt, columns=["Datei", "Bytes"]), hide_index=True)
 
-        if len(pdf_dateien) == 0:
+        if len(pdf_inhalt) == 0:
             st.warning("⚠️ Es wurden keine PDF-Dateien erzeugt. Prüfe die Spalte 'Mitarbeiter'.")
         else:
-            zip_buffer = BytesIO()
-            with ZipFile(zip_buffer, "w") as zipf:
-                for dateiname, pdf_buffer in pdf_dateien:
-                    zipf.writestr(dateiname, pdf_buffer.read())
-            zip_buffer.seek(0)
-
+            # Streamlit nimmt keine SpooledTemporaryFile an; der Spool bleibt
+            # beim Auftrag (weitere Reruns), daher nur lesen, nicht schließen
             st.download_button(
                 label="📥 ZIP herunterladen",
-                data=zip_buffer,
+                data=zip_datei.read(),
                 file_name="provisionen_export.zip",
                 mime="application/zip"
             )
+        if st.button("Export schließen"):
+            del st.query_params["export"]
+            st.rerun()
+
+# Frühere Abrechnungen ohne Quelldateien erneut als PDFs erzeugen
+if journal_aktiv:
+    laeufe = journal.laeufe()
+    if not laeufe.empty:
+        st.markdown("---")
+        st.subheader("📒 Frühere Abrechnungen")
+        st.dataframe(laeufe, hide_index=True)
+        lauf_id = st.selectbox("Lauf", laeufe["lauf_id"])
+        if st.button("📥 PDFs dieses Laufs erneut erzeugen"):
+            zip_datei, pdf_inhalt = exportiere_zip(journal.lauf_laden(lauf_id))
+            with zip_datei:
+                zip_bytes = zip_datei.read()
+            st.download_button(
+                label="📥 ZIP herunterladen",
+                data=zip_bytes,
+                file_name=f"provisionen_{lauf_id}.zip",
+                mime="application/zip"
+            )
+
+# Messwerte-Panel (Sidebar)
+if messung_aktiv:
+    st.sidebar.subheader("⏱️ Messwerte")
+    if not st.session_state.messprotokolle:
+        st.sidebar.caption("Noch keine Messung – Berechnung oder Export starten.")
+    for ablauf, protokoll in st.session_state.messprotokolle.items():
+        st.sidebar.markdown(f"**{ablauf}**")
+        st.sidebar.dataframe(protokoll.zusammenfassung(), hide_index=True)
+
+    st.sidebar.markdown("**App-Durchläufe**")
+    prozess = _prozess_laufzeiten()
+    if prozess:
+        st.sidebar.caption(
+            f"Kaltstart: {prozess['kaltstart_sekunden'] * 1000:.0f} ms "
+            f"(davon Imports {prozess['import_sekunden'] * 1000:.0f} ms)"
+        )
+    durchlaeufe = st.session_state.get("durchlaeufe", [])
+    if durchlaeufe:
+        letzte = pd.Series(durchlaeufe[-50:]) * 1000
+        st.sidebar.caption(
+            f"Rerun: zuletzt {letzte.iloc[-1]:.0f} ms, "
+            f"Median {letzte.median():.0f} ms ({len(letzte)} Durchläufe)"
+        )
+
+# Dauer dieses Durchlaufs (ohne abgebrochene Läufe, z. B. durch st.rerun)
+_dauer = time.perf_counter() - _DURCHLAUF_START
+_prozess = _prozess_laufzeiten()
+if not _prozess:
+    _prozess.update(kaltstart_sekunden=_dauer, import_sekunden=_IMPORT_SEKUNDEN)
+st.session_state.setdefault("durchlaeufe", []).append(_dauer)
+del st.session_state.durchlaeufe[:-50]
+logger.info(json.dumps({
+    "stufe": "app_durchlauf",
+    "sekunden": round(_dauer, 6),
+    "import_sekunden": round(_IMPORT_SEKUNDEN, 6),
+}))
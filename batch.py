@@ -0,0 +1,178 @@
+"""
+Provisionsabrechnung ohne Streamlit (z. B. Monatsabschluss mehrerer Gesellschaften).
+
+Je Paar aus Rechnungs- und Provisionsdatei und je Rückblick-Zeitraum wird
+in einem eigenen Prozess berechnet und nach ``--ausgabe/<name>_<monate>m/``
+geschrieben:
+  - provisionen_export.zip   (PDF je Mitarbeiter)
+  - zusammenfassung.csv      (Summen je Mitarbeiter, ;-getrennt, deutsches Format)
+
+Beispiel::
+
+    python batch.py --lauf firma_a/rechnungen.csv firma_a/provisionen.xlsx \\
+                    --lauf firma_b/rechnungen.xlsx firma_b/provisionen.xlsx \\
+                    --monate 1 3 --ausgabe export/
+
+Mit ``--journal journal.sqlite`` werden bereits abgerechnete bezahlte Rechnungen
+übersprungen und die neuen nach erfolgreichem Lauf als abgerechnet verbucht
+(inkrementeller Monatsabschluss, nur ein ``--monate``-Wert).
+
+Mit ``--pdf-ablage VERZEICHNIS`` werden die PDFs deterministisch erzeugt und
+inhaltsadressiert abgelegt: Mitarbeiter mit unveränderten Zeilen und Sätzen
+werden bei einem erneuten Lauf (z. B. Entwurf → endgültig) übernommen statt
+neu gerendert; ``manifest.json`` im ZIP listet, welche Abrechnungen sich
+gegenüber dem letzten Lauf in dasselbe Ausgabeverzeichnis geändert haben.
+
+Exit-Code 1, wenn ein Lauf oder das PDF eines Mitarbeiters fehlschlägt.
+"""
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from utils.geld import cent_zu_euro
+from utils.ingest import lese_provisionen
+from utils.journal import Abrechnungsjournal
+from utils.logic import berechne_provisionen
+from utils.pdf_ablage import PdfAblage
+from utils.pdf_generator import exportiere_zip
+
+
+def zusammenfassung(df):
+    """Summen je Mitarbeiter: bezahlte Rechnungen (Auszahlung) und offene (Vorschau)."""
+    bezahlt = df["Status"].astype(str) == "Bezahlt"
+    summen = (
+        df.assign(
+            Netto_bezahlt=df["Netto_Cent"].where(bezahlt, 0),
+            Praemie_bezahlt=df["Provision_Cent"].where(bezahlt, 0),
+            Praemie_Vorschau=df["Provision_Cent"].where(~bezahlt, 0),
+        )
+        .groupby("Mitarbeiter", sort=True, observed=True)
+        .agg(
+            Rechnungen=("Rechnungsnummer", "size"),
+            Netto_bezahlt=("Netto_bezahlt", "sum"),
+            Praemie_bezahlt=("Praemie_bezahlt", "sum"),
+            Praemie_Vorschau=("Praemie_Vorschau", "sum"),
+        )
+        .reset_index()
+    )
+    # exakte Cent-Summen → Euro
+    for spalte in ["Netto_bezahlt", "Praemie_bezahlt", "Praemie_Vorschau"]:
+        summen[spalte] = cent_zu_euro(summen[spalte])
+    return summen
+
+
+def fuehre_lauf_aus(
+    rechnungen_pfad, provisionen_pfad, monate_rueckblick, ziel, journal_pfad=None, ablage_pfad=None
+):
+    """Ein Lauf (im Worker-Prozess). Gibt ein dict mit Ergebnis/Fehlern zurück."""
+    lauf = {"ziel": str(ziel), "mitarbeiter": 0, "fehler": [], "parsefehler": []}
+    try:
+        journal = Abrechnungsjournal(journal_pfad) if journal_pfad else None
+        with open(rechnungen_pfad, "rb") as rechnungen_file, \
+                open(provisionen_pfad, "rb") as provisionen_file:
+            parsefehler = []
+            df = berechne_provisionen(
+                rechnungen_file, provisionen_file, monate_rueckblick,
+                journal=journal, fehler=parsefehler,
+            )
+        lauf["parsefehler"] = [
+            f"Zeile {f['zeile']}, {f['spalte']}: {f['wert']!r}" for f in parsefehler
+        ]
+
+        ziel.mkdir(parents=True, exist_ok=True)
+        if df.empty:
+            return lauf
+
+        zusammenfassung(df).to_csv(
+            ziel / "zusammenfassung.csv", sep=";", decimal=",", index=False, encoding="utf-8"
+        )
+
+        optionen = {}
+        if ablage_pfad:
+            with open(provisionen_pfad, "rb") as provisionen_file:
+                provisionen = lese_provisionen(provisionen_file)
+            optionen = {
+                "ablage": PdfAblage(ablage_pfad),
+                "provisionen": provisionen,
+                "kontext": str(ziel),
+                "manifest": [],
+            }
+
+        pdf_fehler = []
+        with open(ziel / "provisionen_export.zip", "wb") as zip_datei:
+            _, inhalt = exportiere_zip(df, ziel=zip_datei, fehler=pdf_fehler, **optionen)
+        if ablage_pfad:
+            lauf["aenderungen"] = {}
+            for eintrag in optionen["manifest"]:
+                status = eintrag["status"]
+                lauf["aenderungen"][status] = lauf["aenderungen"].get(status, 0) + 1
+        lauf["mitarbeiter"] = len(inhalt)
+        lauf["fehler"] = [f"{mitarbeiter}: {meldung}" for mitarbeiter, meldung in pdf_fehler]
+
+        # nur vollständig erzeugte Abrechnungen verbuchen
+        if journal is not None and not lauf["fehler"]:
+            lauf_id = journal.verbuche(df, bezeichnung=str(ziel))
+            if lauf_id is not None:
+                lauf["lauf_id"] = lauf_id
+    except Exception as e:
+        lauf["fehler"].append(f"Lauf abgebrochen: {e}")
+    return lauf
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Provisionsabrechnung im Batch (ohne Streamlit)")
+    parser.add_argument(
+        "--lauf", nargs=2, action="append", required=True, metavar=("RECHNUNGEN", "PROVISIONEN"),
+        help="Rechnungsdatei (CSV/Excel) und Provisionssätze (Excel); mehrfach angebbar",
+    )
+    parser.add_argument("--monate", type=int, nargs="+", default=[1],
+                        help="Rückblick-Zeiträume in Monaten (je Lauf alle)")
+    parser.add_argument("--ausgabe", type=Path, default=Path("export"))
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse")
+    parser.add_argument("--journal", type=Path, default=None,
+                        help="SQLite-Journal: bereits abgerechnete Rechnungen überspringen, neue verbuchen")
+    parser.add_argument("--pdf-ablage", type=Path, default=None,
+                        help="Verzeichnis für deterministische PDFs: unveränderte Mitarbeiter übernehmen")
+    args = parser.parse_args(argv)
+
+    if args.journal and len(args.monate) > 1:
+        parser.error("--journal kann nur mit einem --monate-Wert verwendet werden.")
+
+    auftraege = []
+    for rechnungen_pfad, provisionen_pfad in args.lauf:
+        name = Path(rechnungen_pfad).parent.name or Path(rechnungen_pfad).stem
+        for monate in args.monate:
+            ziel = args.ausgabe / f"{name}_{monate}m"
+            auftraege.append(
+                (rechnungen_pfad, provisionen_pfad, monate, ziel, args.journal, args.pdf_ablage)
+            )
+
+    if len({a[3] for a in auftraege}) != len(auftraege):
+        parser.error("Mehrere Läufe würden in dasselbe Ausgabeverzeichnis schreiben.")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        ergebnisse = list(pool.map(fuehre_lauf_aus, *zip(*auftraege)))
+
+    fehlgeschlagen = False
+    for lauf in ergebnisse:
+        status = "❌" if lauf["fehler"] else "✅"
+        verbucht = f" (verbucht: Lauf {lauf['lauf_id']})" if "lauf_id" in lauf else ""
+        print(f"{status} {lauf['ziel']}: {lauf['mitarbeiter']} PDF(s){verbucht}")
+        if "aenderungen" in lauf:
+            print("    Änderungen: " + ", ".join(
+                f"{anzahl} {status}" for status, anzahl in sorted(lauf["aenderungen"].items())
+            ))
+        for meldung in lauf["fehler"]:
+            print(f"    {meldung}")
+            fehlgeschlagen = True
+        if lauf["parsefehler"]:
+            print(f"    ⚠️ {len(lauf['parsefehler'])} nicht lesbare(r) Wert(e) in der Rechnungsdatei:")
+            for meldung in lauf["parsefehler"][:10]:
+                print(f"      {meldung}")
+
+    return 1 if fehlgeschlagen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Synthetische Rechnungs- und Provisionsdaten im Format der ERP-Exporte.
+
+- Rechnungen: ``;``-getrennt, Beträge ``1.234,56``, Datum ``TT.MM.JJJJ``,
+  gemischt Bezahlt/Offen, Eigen-/Fremdleistung, zusätzliche ungenutzte Spalten
+- Provisionssätze: Excel mit Mitarbeiter / Eigenleistung / Fremdleistung
+
+Aufruf (schreibt rechnungen.csv und provisionen.xlsx)::
+
+    python -m benchmarks.datengenerator --rechnungen 100000 --mitarbeiter 100 --ziel /tmp/daten
+"""
+import argparse
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class SpeicherDatei(BytesIO):
+    """BytesIO mit ``name`` – verhält sich wie Streamlits ``UploadedFile``."""
+
+    def __init__(self, daten, name):
+        super().__init__(daten)
+        self.name = name
+
+
+def erzeuge_rechnungen(anzahl, seed=0, heute=None, extra_spalten=6, tage_rueckblick=400):
+    """Rechnungsexport als DataFrame aus Strings (so wie er in der Datei steht)."""
+    rng = np.random.default_rng(seed)
+    heute = pd.Timestamp(heute or pd.Timestamp.now()).normalize()
+
+    rechnungsdatum = heute - pd.to_timedelta(rng.integers(0, tage_rueckblick, anzahl), unit="D")
+    zahlungsziel = pd.to_timedelta(rng.integers(0, 60, anzahl), unit="D")
+    status = rng.choice(["Bezahlt", "Offen", "Teilbezahlt"], anzahl, p=[0.7, 0.25, 0.05])
+    bezahlt = status == "Bezahlt"
+
+    # Beträge: überwiegend positiv, einige Gutschriften
+    netto = np.round(rng.lognormal(7.0, 1.2, anzahl), 2)
+    netto[rng.random(anzahl) < 0.02] *= -1
+
+    zahlungsdatum = pd.Series((rechnungsdatum + zahlungsziel).strftime("%d.%m.%Y"))
+    zahlungsdatum[~bezahlt] = ""
+
+    df = pd.DataFrame({
+        "Rechnungsnr.": pd.Series(np.arange(anzahl) + 100000).map("RE-{:d}".format),
+        "Kunde": pd.Series(rng.integers(0, max(anzahl // 20, 1), anzahl)).map("Kunde {:d} GmbH".format),
+        "Projekt": pd.Series(rng.integers(0, max(anzahl // 50, 1), anzahl)).map("Projekt {:d}".format),
+        "Rechnungsdatum": rechnungsdatum.strftime("%d.%m.%Y"),
+        "letztes Bezahldatum": zahlungsdatum,
+        "Status": status,
+        "Netto": [_deutsch(v) for v in netto],
+        "Fremdleistung": rng.choice(["", "nein", "ja", "Ja"], anzahl, p=[0.5, 0.2, 0.2, 0.1]),
+    })
+
+    # ungenutzte ERP-Spalten
+    for i in range(extra_spalten):
+        df[f"Feld_{i + 1}"] = rng.integers(0, 10_000, anzahl).astype(str)
+
+    return df
+
+
+def erzeuge_provisionen(anzahl_mitarbeiter, seed=0):
+    """Provisionssätze je Mitarbeiter; ein Teil hat keinen Fremdleistungssatz."""
+    rng = np.random.default_rng(seed + 1)
+    fremd = rng.choice([1.0, 1.5, 2.0], anzahl_mitarbeiter)
+    fremd[rng.random(anzahl_mitarbeiter) < 0.3] = np.nan
+    return pd.DataFrame({
+        "Mitarbeiter": [f"Mitarbeiter {i + 1:04d}" for i in range(anzahl_mitarbeiter)],
+        "Eigenleistung": rng.choice([2.0, 2.5, 3.0, 4.0, 5.0], anzahl_mitarbeiter),
+        "Fremdleistung": fremd,
+    })
+
+
+def als_csv_bytes(df):
+    return df.to_csv(sep=";", index=False).encode("utf-8")
+
+
+def als_excel_bytes(df):
+    buffer = BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _deutsch(wert):
+    s = f"{wert:,.2f}"
+    return s.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetische Rechnungs-/Provisionsdaten erzeugen")
+    parser.add_argument("--rechnungen", type=int, default=10_000)
+    parser.add_argument("--mitarbeiter", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ziel", type=Path, default=Path("."))
+    args = parser.parse_args(argv)
+
+    args.ziel.mkdir(parents=True, exist_ok=True)
+    (args.ziel / "rechnungen.csv").write_bytes(
+        als_csv_bytes(erzeuge_rechnungen(args.rechnungen, seed=args.seed))
+    )
+    (args.ziel / "provisionen.xlsx").write_bytes(
+        als_excel_bytes(erzeuge_provisionen(args.mitarbeiter, seed=args.seed))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark-Suite: Laufzeit und Spitzen-Speicher je Stufe für
+Einlesen, Provisionsberechnung und PDF/ZIP-Export auf synthetischen Daten.
+
+Standardraster: 10k / 100k / 1M Rechnungen × 10 / 100 / 1000 Mitarbeiter.
+Kombinationen, deren Ergebnis zu groß wird, werden übersprungen
+(``--max-zeilen`` / ``--max-pdf-zeilen``).
+
+    # Messen und als Baseline speichern
+    python -m benchmarks.run_benchmarks --baseline-speichern lokal
+    # Später gegen die Baseline vergleichen (Exit-Code 1 bei Regression)
+    python -m benchmarks.run_benchmarks --vergleiche lokal --toleranz 0.25
+
+Baselines liegen in ``benchmarks/baselines/<name>.json`` und sind
+maschinenabhängig – nur auf derselben Maschine vergleichen.
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.datengenerator import (
+    SpeicherDatei,
+    als_csv_bytes,
+    als_excel_bytes,
+    erzeuge_provisionen,
+    erzeuge_rechnungen,
+)
+from utils.ingest import lese_provisionen, lese_rechnungen
+from utils.instrumentation import mit_messung
+from utils.logic import berechne_provisionen_aus_tabellen
+from utils.pdf_generator import exportiere_zip
+
+BASELINE_VERZEICHNIS = Path(__file__).parent / "baselines"
+
+RECHNUNGEN = [10_000, 100_000, 1_000_000]
+MITARBEITER = [10, 100, 1000]
+MONATE_RUECKBLICK = 12
+
+
+def miss_kombination(anzahl_rechnungen, anzahl_mitarbeiter, args):
+    """Eine Kombination messen; liefert {stufe: {sekunden, spitze_bytes, zeilen}}."""
+    rechnungen = erzeuge_rechnungen(anzahl_rechnungen, seed=args.seed)
+    if args.excel:
+        rechnungen_datei = SpeicherDatei(als_excel_bytes(rechnungen), "rechnungen.xlsx")
+    else:
+        rechnungen_datei = SpeicherDatei(als_csv_bytes(rechnungen), "rechnungen.csv")
+    provisionen_datei = SpeicherDatei(
+        als_excel_bytes(erzeuge_provisionen(anzahl_mitarbeiter, seed=args.seed)), "provisionen.xlsx"
+    )
+
+    ergebnis = {}
+    with mit_messung(speicher=not args.ohne_speicher) as protokoll:
+        rechnungen = lese_rechnungen(rechnungen_datei)
+        provisionen = lese_provisionen(provisionen_datei)
+
+        # Ergebnisgröße grob abschätzen (jede Rechnung × jeder Mitarbeiter)
+        if anzahl_rechnungen * anzahl_mitarbeiter > args.max_zeilen:
+            ergebnis["uebersprungen"] = "provisionsberechnung"
+        else:
+            df = berechne_provisionen_aus_tabellen(rechnungen, provisionen, MONATE_RUECKBLICK)
+            if args.ohne_pdf or len(df) > args.max_pdf_zeilen:
+                ergebnis["uebersprungen"] = "pdf"
+            else:
+                zip_datei, _ = exportiere_zip(df)
+                zip_datei.close()
+
+    for zeile in protokoll.zusammenfassung().to_dict("records"):
+        werte = {"sekunden": zeile["sekunden"], "zeilen": zeile["zeilen"]}
+        if "spitze_bytes" in zeile:
+            werte["spitze_bytes"] = zeile["spitze_bytes"]
+        ergebnis[zeile["stufe"]] = werte
+    return ergebnis
+
+
+def vergleiche(aktuell, baseline, toleranz):
+    """Regressionen (Laufzeit oder Speicher > Baseline × (1 + toleranz)) auflisten."""
+    regressionen = []
+    for kombination, stufen in aktuell["ergebnisse"].items():
+        alt_stufen = baseline["ergebnisse"].get(kombination, {})
+        for stufe, werte in stufen.items():
+            alt = alt_stufen.get(stufe)
+            if not isinstance(werte, dict) or not isinstance(alt, dict):
+                continue
+            for metrik in ("sekunden", "spitze_bytes"):
+                if metrik in werte and alt.get(metrik):
+                    faktor = werte[metrik] / alt[metrik]
+                    if faktor > 1 + toleranz:
+                        regressionen.append((kombination, stufe, metrik, alt[metrik], werte[metrik], faktor))
+    return regressionen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Provisionstool")
+    parser.add_argument("--rechnungen", type=int, nargs="+", default=RECHNUNGEN)
+    parser.add_argument("--mitarbeiter", type=int, nargs="+", default=MITARBEITER)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-zeilen", type=int, default=50_000_000,
+                        help="Kombinationen mit mehr Rechnungen × Mitarbeitern überspringen")
+    parser.add_argument("--max-pdf-zeilen", type=int, default=500_000,
+                        help="PDF/ZIP-Export nur bis zu dieser Ergebnisgröße messen")
+    parser.add_argument("--ohne-pdf", action="store_true")
+    parser.add_argument("--excel", action="store_true",
+                        help="Rechnungen als Excel statt CSV einlesen (Excel-Einlesepfad messen)")
+    parser.add_argument("--ohne-speicher", action="store_true",
+                        help="kein tracemalloc (schneller, aber ohne Spitzen-Speicher)")
+    parser.add_argument("--ausgabe", type=Path, help="Ergebnisse zusätzlich als JSON schreiben")
+    parser.add_argument("--baseline-speichern", metavar="NAME")
+    parser.add_argument("--vergleiche", metavar="NAME")
+    parser.add_argument("--toleranz", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    lauf = {
+        "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maschine": platform.node(),
+        "ergebnisse": {},
+    }
+    for anzahl_rechnungen in args.rechnungen:
+        for anzahl_mitarbeiter in args.mitarbeiter:
+            kombination = f"{anzahl_rechnungen}x{anzahl_mitarbeiter}"
+            print(f"▶ {kombination} …", flush=True)
+            ergebnis = miss_kombination(anzahl_rechnungen, anzahl_mitarbeiter, args)
+            lauf["ergebnisse"][kombination] = ergebnis
+            for stufe, werte in ergebnis.items():
+                print(f"    {stufe}: {werte}")
+
+    if args.ausgabe:
+        args.ausgabe.write_text(json.dumps(lauf, indent=2, ensure_ascii=False))
+
+    if args.baseline_speichern:
+        BASELINE_VERZEICHNIS.mkdir(exist_ok=True)
+        pfad = BASELINE_VERZEICHNIS / f"{args.baseline_speichern}.json"
+        pfad.write_text(json.dumps(lauf, indent=2, ensure_ascii=False))
+        print(f"Baseline gespeichert: {pfad}")
+
+    if args.vergleiche:
+        pfad = BASELINE_VERZEICHNIS / f"{args.vergleiche}.json"
+        regressionen = vergleiche(lauf, json.loads(pfad.read_text()), args.toleranz)
+        for kombination, stufe, metrik, alt, neu, faktor in regressionen:
+            print(f"⚠️ Regression {kombination} / {stufe} / {metrik}: {alt} → {neu} (×{faktor:.2f})")
+        if regressionen:
+            return 1
+        print("Keine Regressionen gegenüber Baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Cent-Arithmetik (``utils.geld``): Rundung halb vom Betrag weg, exakte Summen."""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from utils.geld import (
+    cent_zu_euro,
+    euro_zu_cent,
+    format_cent,
+    parse_cent,
+    provision_cent,
+    satz_skaliert,
+)
+
+
+def _erwartet(netto_cent, satz_prozent):
+    wert = Decimal(int(netto_cent)) * Decimal(str(float(satz_prozent))) / 100
+    return int(wert.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+@pytest.mark.parametrize("text, cent", [
+    ("1234.56", 123456),
+    ("-1234.56", -123456),
+    ("0.5", 50),
+    (".5", 50),
+    ("12", 1200),
+    ("12.", 1200),
+    ("1.005", 101),
+    ("1.004", 100),
+    ("-1.005", -101),
+    ("2.999", 300),
+    ("", 0),
+    ("abc", 0),
+])
+def test_parse_cent(text, cent):
+    assert parse_cent([text])[0] == cent
+
+
+def test_euro_zu_cent_halbe_cent_und_nan():
+    # exakt darstellbare halbe Cent (Excel-Zahlen); Text geht über parse_cent
+    euro = [0.125, -0.125, 0.375, -0.625, 1234.56, np.nan, -0.004]
+    np.testing.assert_array_equal(euro_zu_cent(euro), [13, -13, 38, -63, 123456, 0, 0])
+
+
+@pytest.mark.parametrize("netto_cent, satz", [
+    (1000, 2.5),        # 25 Cent glatt
+    (1010, 2.5),        # 25,25 → 25
+    (1020, 2.5),        # 25,5 → 26 (halber Cent)
+    (-1020, 2.5),       # Gutschrift: -25,5 → -26
+    (-1020, -2.5),      # Gutschrift mit negativem Satz → positiv
+    (123456, 1.25),
+    (99, 0.5),          # 0,495 → 0
+    (101, 0.5),         # 0,505 → 1
+    (33333, 3.3333),    # mehr als zwei Nachkommastellen im Satz
+])
+def test_provision_cent(netto_cent, satz):
+    ergebnis = provision_cent([netto_cent], satz_skaliert([satz]).astype(np.int64))
+    assert ergebnis[0] == _erwartet(netto_cent, satz)
+
+
+def test_provision_cent_gegen_decimal():
+    rng = np.random.default_rng(3)
+    netto = rng.integers(-5_000_000, 5_000_000, 2000)
+    saetze = rng.choice([0.5, 1.25, 2.5, 3.0, 7.75, -2.0], 2000)
+    ergebnis = provision_cent(netto, satz_skaliert(saetze).astype(np.int64))
+    erwartet = [_erwartet(n, s) for n, s in zip(netto, saetze)]
+    np.testing.assert_array_equal(ergebnis, erwartet)
+
+
+def test_summen_exakt():
+    # 0,10 € × 10: als float 0.9999999999999999, in Cent exakt
+    cent = parse_cent(["0.10"] * 10)
+    assert cent.sum() == 100
+    assert cent_zu_euro(cent.sum()) == 1.0
+    assert sum(cent_zu_euro(cent)) != 1.0
+
+
+@pytest.mark.parametrize("cent, text", [
+    (0, "0,00 €"),
+    (5, "0,05 €"),
+    (-5, "-0,05 €"),
+    (123456, "1.234,56 €"),
+    (-123456, "-1.234,56 €"),
+    (123456789012, "1.234.567.890,12 €"),
+    (np.int64(-100000), "-1.000,00 €"),
+])
+def test_format_cent(cent, text):
+    assert format_cent(cent) == text
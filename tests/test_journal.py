@@ -0,0 +1,61 @@
+"""Abrechnungsjournal (``utils.journal``): Anti-Join und Verbuchung."""
+import pandas as pd
+import pytest
+
+from utils.journal import Abrechnungsjournal
+
+
+def _ergebnis(zeilen):
+    df = pd.DataFrame(zeilen, columns=["Mitarbeiter", "Rechnungsnummer", "Status"])
+    return df.assign(
+        Kunde="Kunde", Projekt="P", Netto=100.0, Provision=2.5,
+        Zahlungsdatum=pd.Timestamp("2025-05-03"), Ist_Fremdleistung=False,
+        Netto_Cent=10000, Provision_Cent=250,
+    )
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return Abrechnungsjournal(tmp_path / "journal.sqlite")
+
+
+def test_nur_neue_mit_leerem_journal(journal):
+    df = _ergebnis([("Anna", "R1", "Bezahlt"), ("Ben", "R1", "Offen")])
+    pd.testing.assert_frame_equal(journal.nur_neue(df), df)
+
+
+def test_nur_neue_entfernt_nur_verbuchte_paare(journal):
+    journal.verbuche(_ergebnis([("Anna", "R1", "Bezahlt"), ("Anna", "R2", "Bezahlt")]))
+    df = _ergebnis([
+        ("Anna", "R1", "Bezahlt"),   # verbucht → entfällt
+        ("Ben", "R1", "Bezahlt"),    # gleiche Rechnung, anderer Mitarbeiter
+        ("Anna", "R2", "Offen"),     # offene Rechnungen bleiben immer
+        ("Anna", "R3", "Bezahlt"),
+    ])
+    df["Mitarbeiter"] = df["Mitarbeiter"].astype("category")
+    neu = journal.nur_neue(df)
+    assert list(zip(neu["Mitarbeiter"], neu["Rechnungsnummer"])) == [
+        ("Ben", "R1"), ("Anna", "R2"), ("Anna", "R3"),
+    ]
+
+
+def test_verbuche_ohne_bezahlte_zeilen(journal):
+    assert journal.verbuche(_ergebnis([("Anna", "R1", "Offen")])) is None
+    assert journal.laeufe().empty
+
+
+def test_doppelte_verbuchung(journal):
+    df = _ergebnis([("Anna", "R1", "Bezahlt")])
+    journal.verbuche(df)
+    with pytest.raises(ValueError):
+        journal.verbuche(df)
+    assert len(journal.laeufe()) == 1
+
+
+def test_lauf_laden(journal):
+    df = _ergebnis([("Anna", "R1", "Bezahlt"), ("Ben", "R2", "Bezahlt"), ("Ben", "R3", "Offen")])
+    lauf_id = journal.verbuche(df, bezeichnung="Mai")
+    lauf = journal.lauf_laden(lauf_id)
+    assert list(lauf["Rechnungsnummer"]) == ["R1", "R2"]
+    assert lauf["Provision_Cent"].sum() == 500
+    assert journal.laeufe().loc[0, "zeilen"] == 2
@@ -0,0 +1,118 @@
+"""Beträge und Datumswerte aus Rechnungsexporten (``utils.parsing``)."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ingest import normalisiere_rechnungen
+from utils.parsing import parse_betrag_cent, parse_datum
+
+
+@pytest.mark.parametrize("text, cent", [
+    ("1.234,56", 123456),
+    ("-1.234,56", -123456),
+    ("1.234,56-", -123456),          # nachgestelltes Minus (SAP/DATEV)
+    ("(1.234,56)", -123456),         # Klammern = Gutschrift
+    ("1.234,56 €", 123456),
+    ("-1.234,56 €", -123456),
+    ("EUR 12,5", 1250),
+    ("12,50 EUR", 1250),
+    (" 1.000,00 €", 100000),  # geschützte Leerzeichen
+    ("+7", 700),
+    ("12,345", 1235),                # mehr als zwei Nachkommastellen, gerundet
+    ("0,005", 1),
+])
+def test_betrag_deutsch(text, cent):
+    werte, ungueltig = parse_betrag_cent(pd.Series([text], dtype=object))
+    assert werte[0] == cent
+    assert not ungueltig[0]
+
+
+def test_betrag_englisch():
+    werte, ungueltig = parse_betrag_cent(pd.Series(["1,234.56", "(5.00)", "-0.5"]), dezimal=".")
+    np.testing.assert_array_equal(werte, [123456, -500, -50])
+    assert not ungueltig.any()
+
+
+def test_betrag_ungueltig_maske():
+    texte = ["1.234,56", "", None, "abc", "1,2,3", "€", "12,50"]
+    werte, ungueltig = parse_betrag_cent(pd.Series(texte, dtype=object))
+    np.testing.assert_array_equal(werte, [123456, 0, 0, 0, 0, 0, 1250])
+    np.testing.assert_array_equal(ungueltig, [False, True, True, True, True, True, False])
+
+
+def test_betrag_excel_gemischte_zellen():
+    # Excel: Zahlzellen (float/int) und Textzellen in derselben Spalte
+    werte, ungueltig = parse_betrag_cent(
+        pd.Series([1234.56, "1.000,10", None, 7, "(2,00)"], dtype=object)
+    )
+    np.testing.assert_array_equal(werte, [123456, 100010, 0, 700, -200])
+    np.testing.assert_array_equal(ungueltig, [False, False, True, False, False])
+
+
+def test_betrag_zahlenspalte():
+    werte, ungueltig = parse_betrag_cent(pd.Series([1.5, -2.25, np.nan]))
+    np.testing.assert_array_equal(werte, [150, -225, 0])
+    np.testing.assert_array_equal(ungueltig, [False, False, True])
+
+
+def test_betrag_wiederholte_werte():
+    texte = ["1,00", "2,00", "1,00", None, "x", "2,00"] * 1000
+    werte, ungueltig = parse_betrag_cent(pd.Series(texte, dtype=object))
+    np.testing.assert_array_equal(werte[:6], [100, 200, 100, 0, 0, 200])
+    assert werte.sum() == 1000 * 600
+    assert ungueltig.sum() == 2000
+
+
+@pytest.mark.parametrize("text, erwartet", [
+    ("03.05.2025", "2025-05-03"),
+    ("2025-05-03", "2025-05-03"),     # ISO nicht als Tag zuerst lesen
+    ("03.05.25", "2025-05-03"),
+    ("03.05.2025 14:30", "2025-05-03 14:30"),
+    ("03.05.2025 14:30:15", "2025-05-03 14:30:15"),
+    ("2025-05-03 14:30:00", "2025-05-03 14:30"),
+    (" 03.05.2025 ", "2025-05-03"),
+])
+def test_datum_formate(text, erwartet):
+    datum, ungueltig = parse_datum(pd.Series([text], dtype=object))
+    assert datum.iloc[0] == pd.Timestamp(erwartet)
+    assert not ungueltig[0]
+
+
+def test_datum_ungueltig_maske():
+    werte = ["03.05.2025", "", None, "31.02.2025", "Mai", "05/03/2025"]
+    datum, ungueltig = parse_datum(pd.Series(werte, dtype=object))
+    assert datum.isna().tolist() == [False, True, True, True, True, True]
+    # leere Werte sind kein Fehler, nicht lesbare schon
+    np.testing.assert_array_equal(ungueltig, [False, False, False, True, True, True])
+
+
+def test_datum_excel_objekte_und_index():
+    werte = pd.Series(
+        [datetime.date(2025, 5, 3), pd.Timestamp("2025-05-04"), "05.05.2025"],
+        index=[10, 11, 12], dtype=object,
+    )
+    datum, ungueltig = parse_datum(werte)
+    assert list(datum.index) == [10, 11, 12]
+    assert list(datum) == [pd.Timestamp(f"2025-05-0{t}") for t in (3, 4, 5)]
+    assert str(datum.dtype) == "datetime64[us]"
+    assert not ungueltig.any()
+
+
+def test_fehlerbericht_normalisierung():
+    roh = pd.DataFrame({
+        "Rechnungsnummer": ["R1", "R2", "R3"],
+        "Netto": ["1.234,56", "abc", ""],
+        "Zahlungsdatum": ["03.05.2025", "31.02.2025", ""],
+        "Status": "Bezahlt",
+    })
+    fehler = []
+    df = normalisiere_rechnungen(roh, dezimal=",", fehler=fehler)
+    assert df["Netto_Cent"].tolist() == [123456, 0, 0]
+    # Zeilennummern wie in der Datei (Kopfzeile = 1)
+    assert fehler == [
+        {"zeile": 3, "spalte": "Netto", "wert": "abc"},
+        {"zeile": 4, "spalte": "Netto", "wert": ""},
+        {"zeile": 3, "spalte": "Zahlungsdatum", "wert": "31.02.2025"},
+    ]
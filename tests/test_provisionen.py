@@ -0,0 +1,178 @@
+"""
+Parität der vektorisierten Provisionsberechnung mit der früheren Schleife
+über ``provisionen.iterrows()`` (``_alte_schleife`` ist eine Kopie davon).
+
+Die Schleife rechnet in float-Euro, die vektorisierte Fassung in ganzen Cent
+(kaufmännisch gerundet); Provisionen werden daher auf 0,5 Cent genau
+verglichen. Beträge ≥ 1 € und Sätze ≥ 1 % vermeiden Provisionen, die erst
+durch die Rundung auf 0 Cent herausfallen.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ingest import normalisiere_rechnungen
+from utils.logic import ERGEBNIS_SPALTEN, _berechne_provisionen_vektorisiert
+
+ALTE_SPALTEN = ERGEBNIS_SPALTEN[:9]
+
+
+def _alte_schleife(rechnungen, provisionen):
+    alle = []
+
+    for _, row in provisionen.iterrows():
+        mitarbeiter = row.get("Mitarbeiter")
+        prov_eigen = float(row.get("Eigenleistung", 0) or 0)
+        prov_fremd = row.get("Fremdleistung")  # kann NaN sein
+
+        df = rechnungen.copy()
+        df["Provision"] = 0.0
+
+        # Eigenleistung: alle Rechnungen ohne Fremdleistung
+        mask_eigen = ~df["Ist_Fremdleistung"]
+        df.loc[mask_eigen, "Provision"] = (
+            df.loc[mask_eigen, "Netto"] * (prov_eigen / 100.0)
+        )
+
+        # Fremdleistung: nur wenn Satz vorhanden
+        if pd.notna(prov_fremd):
+            prov_fremd = float(prov_fremd or 0)
+            mask_fremd = df["Ist_Fremdleistung"]
+            df.loc[mask_fremd, "Provision"] = (
+                df.loc[mask_fremd, "Netto"] * (prov_fremd / 100.0)
+            )
+        else:
+            # keine Fremdleistungsprovision für diesen MA → Fremdleistungen raus
+            df = df[~df["Ist_Fremdleistung"]]
+
+        # nur Rechnungen mit Provision > 0 behalten
+        df = df[df["Provision"] > 0]
+
+        if df.empty:
+            continue
+
+        df["Mitarbeiter"] = mitarbeiter
+        alle.append(df)
+
+    if not alle:
+        return pd.DataFrame(columns=ALTE_SPALTEN)
+
+    result = pd.concat(alle, ignore_index=True)
+
+    return result[ALTE_SPALTEN]
+
+
+def _rechnungen(netto, fremd):
+    roh = pd.DataFrame({
+        "Rechnungsnummer": [f"R{i:05d}" for i in range(len(netto))],
+        "Kunde": [f"Kunde {i % 7}" for i in range(len(netto))],
+        "Projekt": [f"P{i % 5}" for i in range(len(netto))],
+        "Netto": netto,
+        "Zahlungsdatum": ["03.05.2025"] * len(netto),
+        "Status": ["Bezahlt"] * len(netto),
+        "Fremdleistung": ["ja" if f else "" for f in fremd],
+    })
+    return normalisiere_rechnungen(roh, dezimal=",")
+
+
+def _pruefe_paritaet(rechnungen, provisionen):
+    erwartet = _alte_schleife(rechnungen, provisionen)
+    ergebnis = _berechne_provisionen_vektorisiert(rechnungen, provisionen)
+
+    assert list(ergebnis.columns) == ERGEBNIS_SPALTEN
+    assert len(ergebnis) == len(erwartet)
+    if erwartet.empty:
+        return ergebnis
+    ohne_provision = [s for s in ALTE_SPALTEN if s != "Provision"]
+    pd.testing.assert_frame_equal(
+        ergebnis[ohne_provision].reset_index(drop=True),
+        erwartet[ohne_provision].reset_index(drop=True),
+        check_dtype=False,
+    )
+    np.testing.assert_allclose(
+        ergebnis["Provision"].to_numpy(dtype=float),
+        erwartet["Provision"].to_numpy(dtype=float),
+        rtol=0, atol=0.005 + 1e-9,
+    )
+    np.testing.assert_array_equal(
+        ergebnis["Provision"].to_numpy(), ergebnis["Provision_Cent"].to_numpy() / 100
+    )
+    return ergebnis
+
+
+@pytest.fixture
+def rechnungen():
+    return _rechnungen(
+        ["1.234,56", "-250,00", "99,99", "-1.000,10", "5.000,00", "12,34"],
+        [False, False, True, True, False, True],
+    )
+
+
+def test_zufaellige_daten():
+    rng = np.random.default_rng(7)
+    anzahl = 3000
+    cent = rng.integers(100, 2_000_000, anzahl) * rng.choice([1, 1, 1, -1], anzahl)
+    netto = [f"{c / 100:.2f}".replace(".", ",") for c in cent]
+    rechnungen = _rechnungen(netto, rng.random(anzahl) < 0.3)
+
+    saetze = [2.5, 3.0, 1.25, 0.0, -2.0, np.nan]
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": [f"MA {i}" for i in range(12)],
+        "Eigenleistung": rng.choice(saetze, 12),
+        "Fremdleistung": rng.choice(saetze, 12),
+    })
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert not ergebnis.empty
+
+
+def test_fremdleistung_ohne_satz(rechnungen):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben"],
+        "Eigenleistung": [2.5, 3.0],
+        "Fremdleistung": [np.nan, 1.5],
+    })
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert not ergebnis.loc[ergebnis["Mitarbeiter"] == "Anna", "Ist_Fremdleistung"].any()
+    assert ergebnis.loc[ergebnis["Mitarbeiter"] == "Ben", "Ist_Fremdleistung"].any()
+
+
+def test_negatives_netto_mit_negativem_satz(rechnungen):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna"],
+        "Eigenleistung": [-2.0],
+        "Fremdleistung": [-1.0],
+    })
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert (ergebnis["Netto"] < 0).all()
+    assert (ergebnis["Provision"] > 0).all()
+
+
+@pytest.mark.parametrize("spalte", ["Eigenleistung", "Fremdleistung", "Mitarbeiter"])
+def test_fehlende_spalte(rechnungen, spalte):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben"],
+        "Eigenleistung": [2.5, 3.0],
+        "Fremdleistung": [1.0, 2.0],
+    }).drop(columns=spalte)
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert not ergebnis.empty
+
+
+def test_doppelte_mitarbeiternamen(rechnungen):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben", "Anna"],
+        "Eigenleistung": [2.5, 3.0, 1.0],
+        "Fremdleistung": [np.nan, 1.0, 2.0],
+    })
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert (ergebnis["Mitarbeiter"] == "Anna").sum() > (ergebnis["Mitarbeiter"] == "Ben").sum()
+
+
+def test_leeres_ergebnis(rechnungen):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben"],
+        "Eigenleistung": [0.0, np.nan],
+        "Fremdleistung": [np.nan, 0.0],
+    })
+    ergebnis = _pruefe_paritaet(rechnungen, provisionen)
+    assert ergebnis.empty
@@ -0,0 +1,186 @@
+"""Versionierte und gestaffelte Provisionssätze (``utils.saetze``)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.geld import provision_cent, satz_skaliert
+from utils.logic import _berechne_provisionen_vektorisiert
+from utils.saetze import Satztabelle
+
+
+def _rechnungen(zahlungsdaten, netto_cent, fremd=None):
+    anzahl = len(netto_cent)
+    netto_cent = np.asarray(netto_cent, dtype=np.int64)
+    return pd.DataFrame({
+        "Rechnungsnummer": [f"R{i}" for i in range(anzahl)],
+        "Kunde": "Kunde",
+        "Projekt": "P",
+        "Netto": netto_cent / 100,
+        "Zahlungsdatum": pd.to_datetime(zahlungsdaten, dayfirst=True),
+        "Status": "Bezahlt",
+        "Ist_Fremdleistung": np.zeros(anzahl, dtype=bool) if fremd is None else fremd,
+        "Netto_Cent": netto_cent,
+    })
+
+
+def _provision_je_rechnung(rechnungen, provisionen, mitarbeiter="Anna"):
+    ergebnis = _berechne_provisionen_vektorisiert(rechnungen, provisionen)
+    ergebnis = ergebnis[ergebnis["Mitarbeiter"] == mitarbeiter]
+    return dict(zip(ergebnis["Rechnungsnummer"], ergebnis["Provision_Cent"]))
+
+
+def test_gueltig_bis_einschliesslich():
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna"],
+        "Eigenleistung": [2.0],
+        "Gültig ab": ["01.01.2025"],
+        "Gültig bis": ["31.03.2025"],
+    })
+    rechnungen = _rechnungen(["31.12.2024", "01.01.2025", "31.03.2025", "01.04.2025"], [10000] * 4)
+    assert _provision_je_rechnung(rechnungen, provisionen) == {"R1": 200, "R2": 200}
+
+
+def test_spaetestes_gueltig_ab_gewinnt():
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Anna"],
+        "Eigenleistung": [3.0, 2.0],
+        "Gültig ab": ["01.03.2025", "01.01.2025"],
+    })
+    rechnungen = _rechnungen(["28.02.2025", "01.03.2025", "15.06.2025"], [10000] * 3)
+    assert _provision_je_rechnung(rechnungen, provisionen) == {"R0": 200, "R1": 300, "R2": 300}
+
+
+def test_rueckfall_nach_ende_einer_version():
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Anna"],
+        "Eigenleistung": [2.0, 5.0],
+        "Gültig ab": ["01.01.2025", "01.03.2025"],
+        "Gültig bis": [None, "31.03.2025"],
+    })
+    rechnungen = _rechnungen(["15.02.2025", "31.03.2025", "01.04.2025"], [10000] * 3)
+    assert _provision_je_rechnung(rechnungen, provisionen) == {"R0": 200, "R1": 500, "R2": 200}
+
+
+def test_staffel_nach_nettobetrag_der_rechnung():
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna"] * 3,
+        "Eigenleistung": [2.0, 3.0, 4.0],
+        "Umsatz ab": [0, 1000, 5000],
+    })
+    netto = [99999, 100000, 499999, 700000]
+    rechnungen = _rechnungen(["01.05.2025"] * 4, netto)
+    assert _provision_je_rechnung(rechnungen, provisionen) == {
+        "R0": 2000, "R1": 3000, "R2": 15000, "R3": 28000,
+    }
+
+
+def test_staffel_unterhalb_der_ersten_schwelle_ohne_satz():
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna"],
+        "Eigenleistung": [2.0],
+        "Umsatz ab": [500],
+    })
+    rechnungen = _rechnungen(["01.05.2025"] * 2, [49999, 50000])
+    assert _provision_je_rechnung(rechnungen, provisionen) == {"R1": 1000}
+
+
+def test_gutschrift_nach_betrag_gestaffelt():
+    saetze = Satztabelle(pd.DataFrame({
+        "Mitarbeiter": ["Anna"] * 2,
+        "Eigenleistung": [-2.0, -3.0],
+        "Umsatz ab": [0, 1000],
+    }))
+    (raster,) = saetze.raster
+    kontexte = raster.kontexte(None, np.array([150000, -150000, -50000]))
+    assert kontexte[0] == kontexte[1] != kontexte[2]
+
+
+def test_eigene_raster_je_mitarbeiter():
+    # eigene Grenzen je Mitarbeiter werden nicht miteinander gekreuzt
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": [f"MA {i}" for i in range(50) for _ in range(2)],
+        "Eigenleistung": [2.0, 3.0] * 50,
+        "Gültig ab": [d for i in range(50) for d in (None, f"{i % 28 + 1:02d}.01.2025")],
+        "Umsatz ab": [v for i in range(50) for v in (0, 100 + i)],
+    })
+    saetze = Satztabelle(provisionen)
+    # je Mitarbeiter 2 Abschnitte × 3 Stufen statt 29 × 51 im gemeinsamen Raster
+    assert sum(r.satz_eigen.size for r in saetze.raster) == 50 * 2 * 3
+
+
+def _satz_orakel(zeilen, tag, betrag_cent, spalte):
+    """Satz einer Rechnung nach den Regeln der Satztabelle, Zeile für Zeile."""
+    gueltig = [
+        z for z in zeilen
+        if (pd.isna(z["ab"]) or z["ab"] <= tag) and (pd.isna(z["bis"]) or tag <= z["bis"])
+    ]
+    if not gueltig:
+        return np.nan
+    spaetestes = max(gueltig, key=lambda z: pd.Timestamp.min if pd.isna(z["ab"]) else z["ab"])["ab"]
+    version = [
+        z for z in zeilen
+        if (pd.isna(z["ab"]) and pd.isna(spaetestes)) or z["ab"] == spaetestes
+    ]
+    stufen = [z for z in version if round(z["Umsatz ab"] * 100) <= abs(betrag_cent)]
+    if not stufen:
+        return np.nan
+    return max(stufen, key=lambda z: z["Umsatz ab"])[spalte]
+
+
+def test_zufaellige_saetze_gegen_orakel():
+    rng = np.random.default_rng(11)
+    zeilen = []
+    for ma in range(6):
+        for v in range(rng.integers(1, 4)):
+            ab = pd.Timestamp("2024-01-01") + pd.Timedelta(days=int(rng.integers(0, 500)))
+            bis = ab + pd.Timedelta(days=int(rng.integers(10, 300))) if rng.random() < 0.5 else pd.NaT
+            if v == 0 and rng.random() < 0.5:
+                ab = pd.NaT
+            for schwelle in sorted(rng.choice([0, 250, 1000, 4000], rng.integers(1, 4), replace=False)):
+                zeilen.append({
+                    "Mitarbeiter": f"MA {ma}", "ab": ab, "bis": bis, "Umsatz ab": float(schwelle),
+                    "Eigenleistung": float(rng.choice([1.5, 2.0, 3.25])),
+                    "Fremdleistung": float(rng.choice([np.nan, 1.0, 0.5])),
+                })
+    zeilen = pd.DataFrame(zeilen)
+    provisionen = zeilen.assign(
+        **{
+            "Gültig ab": zeilen["ab"].dt.strftime("%d.%m.%Y"),
+            "Gültig bis": zeilen["bis"].dt.strftime("%d.%m.%Y"),
+        }
+    ).drop(columns=["ab", "bis"])
+
+    anzahl = 400
+    tage = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 900, anzahl), unit="D")
+    netto = rng.integers(1000, 800000, anzahl)
+    fremd = rng.random(anzahl) < 0.3
+    rechnungen = _rechnungen(tage.strftime("%d.%m.%Y"), netto, fremd)
+
+    erwartet = []
+    for ma in provisionen["Mitarbeiter"].unique():
+        eigene = zeilen[zeilen["Mitarbeiter"] == ma].to_dict("records")
+        for i in range(anzahl):
+            spalte = "Fremdleistung" if fremd[i] else "Eigenleistung"
+            satz = _satz_orakel(eigene, tage[i], netto[i], spalte)
+            if np.isnan(satz):
+                continue
+            cent = provision_cent([netto[i]], satz_skaliert([satz]).astype(np.int64))[0]
+            if cent > 0:
+                erwartet.append((ma, f"R{i}", cent))
+
+    ergebnis = _berechne_provisionen_vektorisiert(rechnungen, provisionen)
+    assert list(zip(ergebnis["Mitarbeiter"], ergebnis["Rechnungsnummer"], ergebnis["Provision_Cent"])) == erwartet
+
+
+@pytest.mark.parametrize("versioniert", [False, True])
+def test_flache_tabelle_ein_raster(versioniert):
+    provisionen = pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben", "Cem"],
+        "Eigenleistung": [2.0, 3.0, np.nan],
+        "Fremdleistung": [1.0, np.nan, 2.0],
+    })
+    if versioniert:
+        provisionen["Gültig ab"] = None
+    saetze = Satztabelle(provisionen)
+    assert len(saetze.raster) == 1
+    assert saetze.stichtage(_rechnungen(["01.05.2025"], [100])) is None
@@ -0,0 +1,69 @@
+"""Was-wäre-wenn-Summen (``utils.szenarien``) gegen die Einzelberechnung."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.logic import _berechne_provisionen_vektorisiert
+from utils.szenarien import berechne_szenarien, einheitliche_saetze
+
+
+@pytest.fixture
+def rechnungen():
+    rng = np.random.default_rng(5)
+    anzahl = 2000
+    netto = rng.integers(-200000, 2000000, anzahl)
+    return pd.DataFrame({
+        "Rechnungsnummer": [f"R{i}" for i in range(anzahl)],
+        "Kunde": "Kunde",
+        "Projekt": "P",
+        "Netto": netto / 100,
+        "Zahlungsdatum": pd.Timestamp("2024-01-01")
+        + pd.to_timedelta(rng.integers(0, 700, anzahl), unit="D"),
+        "Status": rng.choice(["Bezahlt", "Bezahlt", "Offen"], anzahl),
+        "Ist_Fremdleistung": rng.random(anzahl) < 0.3,
+        "Netto_Cent": netto,
+    })
+
+
+def _flach():
+    return pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Ben", "Cem", "Anna"],
+        "Eigenleistung": [2.5, 3.0, -1.0, 1.25],
+        "Fremdleistung": [np.nan, 1.5, -0.5, 2.0],
+    })
+
+
+def _versioniert():
+    return pd.DataFrame({
+        "Mitarbeiter": ["Anna", "Anna", "Anna", "Ben", "Ben", "Cem"],
+        "Eigenleistung": [2.0, 3.0, 4.0, 1.5, 2.5, 3.0],
+        "Fremdleistung": [1.0, 1.0, np.nan, np.nan, 1.0, 0.5],
+        "Gültig ab": [None, "01.07.2024", "01.07.2024", "15.03.2024", "01.01.2025", None],
+        "Gültig bis": [None, None, None, "31.12.2024", None, "30.06.2025"],
+        "Umsatz ab": [0, 0, 5000, 0, 1000, 0],
+    })
+
+
+def _summen_einzeln(rechnungen, provisionen):
+    bezahlt = rechnungen[rechnungen["Status"] == "Bezahlt"]
+    ergebnis = _berechne_provisionen_vektorisiert(bezahlt, provisionen)
+    return ergebnis.groupby("Mitarbeiter", sort=False)["Provision_Cent"].sum()
+
+
+@pytest.mark.parametrize("provisionen", [_flach(), _versioniert()], ids=["flach", "versioniert"])
+def test_summen_wie_einzelberechnung(rechnungen, provisionen):
+    szenarien = {
+        "Aktuell": provisionen,
+        "Plus": provisionen.assign(Eigenleistung=provisionen["Eigenleistung"] + 0.5),
+        "Einheitlich": einheitliche_saetze(provisionen, 3.0, 1.5),
+    }
+    vergleich = berechne_szenarien(rechnungen, szenarien).set_index("Mitarbeiter")
+
+    for name, tabelle in szenarien.items():
+        erwartet = _summen_einzeln(rechnungen, tabelle)
+        cent = (vergleich[name] * 100).round().astype(np.int64)
+        pd.testing.assert_series_equal(
+            cent.reindex(erwartet.index), erwartet, check_names=False, check_index_type=False,
+        )
+        # Mitarbeiter ohne Provision stehen mit 0 im Vergleich
+        assert (cent.drop(erwartet.index) == 0).all()
@@ -0,0 +1,125 @@
+import hashlib
+from collections import OrderedDict
+
+from utils.ingest import lese_provisionen, lese_rechnungen
+from utils.zeitraum import ZeitraumIndex
+
+
+class LRUCache:
+    """
+    Einfacher LRU-Cache mit Obergrenze für Anzahl Einträge und Speicher (Bytes).
+    Zuletzt benutzte Einträge bleiben erhalten, die ältesten werden verdrängt.
+    """
+
+    def __init__(self, max_eintraege=8, max_bytes=512 * 1024 * 1024):
+        self.max_eintraege = max_eintraege
+        self.max_bytes = max_bytes
+        self._daten = OrderedDict()  # key -> (wert, groesse)
+        self._bytes = 0
+
+    def get(self, key, default=None):
+        if key not in self._daten:
+            return default
+        self._daten.move_to_end(key)
+        return self._daten[key][0]
+
+    def put(self, key, wert, groesse=0):
+        if key in self._daten:
+            self._bytes -= self._daten.pop(key)[1]
+        self._daten[key] = (wert, groesse)
+        self._bytes += groesse
+        # ältesten Eintrag verdrängen, aber den neuen immer behalten
+        while len(self._daten) > 1 and (
+            len(self._daten) > self.max_eintraege or self._bytes > self.max_bytes
+        ):
+            _, (_, alt_groesse) = self._daten.popitem(last=False)
+            self._bytes -= alt_groesse
+
+    def clear(self):
+        self._daten.clear()
+        self._bytes = 0
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def __contains__(self, key):
+        return key in self._daten
+
+    def __len__(self):
+        return len(self._daten)
+
+
+# Prozessweiter Cache: überlebt Streamlit-Reruns und wird von allen Sessions geteilt
+_TABELLEN_CACHE = LRUCache()
+
+
+def inhalt_hash(datei):
+    """Hash über den Dateiinhalt (UploadedFile / BytesIO); Dateiposition bleibt bei 0."""
+    datei.seek(0)
+    h = hashlib.blake2b(digest_size=16)
+    for block in iter(lambda: datei.read(1024 * 1024), b""):
+        h.update(block)
+    datei.seek(0)
+    return h.hexdigest()
+
+
+def _cache_key(art, datei):
+    if isinstance(datei, (list, tuple)):
+        # mehrere Rechnungsdateien: Reihenfolge zählt (spätere Datei gewinnt bei Gleichstand)
+        return (art, tuple(_cache_key("datei", d) for d in datei))
+    # Endung gehört zum Schlüssel, da CSV und Excel unterschiedlich gelesen werden
+    endung = datei.name.rsplit(".", 1)[-1].lower() if "." in datei.name else ""
+    return (art, endung, inhalt_hash(datei))
+
+
+def frame_bytes(df):
+    """Speicherbedarf eines DataFrames inkl. Python-Objekte (Texte)."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def lade_rechnungen(rechnungen_file, cache=_TABELLEN_CACHE, fehler=None):
+    """
+    Normalisierte, typisierte Rechnungstabelle (ohne Zeitraumfilter) aus dem
+    Cache holen bzw. einlesen. Das Ergebnis wird geteilt und darf nicht
+    verändert werden. Die Parsefehler des Einlesens werden mit abgelegt und
+    auch bei einem Treffer an ``fehler`` angehängt.
+    """
+    key = _cache_key("rechnungen", rechnungen_file)
+    eintrag = cache.get(key)
+    if eintrag is None:
+        parsefehler = []
+        rechnungen = lese_rechnungen(rechnungen_file, fehler=parsefehler)
+        eintrag = (rechnungen, parsefehler)
+        cache.put(key, eintrag, frame_bytes(rechnungen))
+    if fehler is not None:
+        fehler.extend(eintrag[1])
+    return eintrag[0]
+
+
+def lade_zeitraum_index(rechnungen_file, cache=_TABELLEN_CACHE, fehler=None):
+    """
+    ``ZeitraumIndex`` über die normalisierten Rechnungen aus dem Cache holen
+    bzw. aufbauen. Ein geänderter Rückblick-Zeitraum ist damit nur noch eine
+    binäre Suche.
+    """
+    key = _cache_key("zeitraum_index", rechnungen_file)
+    eintrag = cache.get(key)
+    if eintrag is None:
+        parsefehler = []
+        index = ZeitraumIndex(lade_rechnungen(rechnungen_file, cache=cache, fehler=parsefehler))
+        eintrag = (index, parsefehler)
+        cache.put(key, eintrag, index.bytes)
+    if fehler is not None:
+        fehler.extend(eintrag[1])
+    return eintrag[0]
+
+
+def lade_provisionen(provisionen_file, cache=_TABELLEN_CACHE):
+    """Provisionssätze aus dem Cache holen bzw. einlesen (nicht verändern)."""
+    key = _cache_key("provisionen", provisionen_file)
+    provisionen = cache.get(key)
+    if provisionen is None:
+        provisionen = lese_provisionen(provisionen_file)
+        cache.put(key, provisionen, frame_bytes(provisionen))
+    return provisionen
@@ -0,0 +1,33 @@
+import pandas as pd
+
+# Textspalten, die sich je (Mitarbeiter × Rechnung) wiederholen → Kategorien
+KATEGORIE_SPALTEN = ["Mitarbeiter", "Rechnungsnummer", "Kunde", "Projekt", "Status"]
+
+# Interne Spalten, die in der Tabellenansicht nicht gezeigt werden
+INTERNE_SPALTEN = ["Netto_Cent", "Provision_Cent"]
+
+
+def kompaktiere(df):
+    """
+    Ergebnis-DataFrame speichersparend ablegen (z. B. in ``st.session_state``):
+    wiederholte Texte als ``category``, Ist_Fremdleistung als bool,
+    Beträge bleiben int64-Cent bzw. float.
+    """
+    if df is None or df.empty:
+        return df
+    df = df.copy()
+    for spalte in KATEGORIE_SPALTEN:
+        if spalte in df.columns and not isinstance(df[spalte].dtype, pd.CategoricalDtype):
+            df[spalte] = df[spalte].astype("category")
+    if "Ist_Fremdleistung" in df.columns:
+        df["Ist_Fremdleistung"] = df["Ist_Fremdleistung"].astype(bool)
+    return df
+
+
+def fuer_anzeige(df):
+    """Kompaktes Ergebnis für ``st.dataframe``: Kategorien als Text, ohne interne Spalten."""
+    df = df.drop(columns=[s for s in INTERNE_SPALTEN if s in df.columns])
+    for spalte in KATEGORIE_SPALTEN:
+        if spalte in df.columns and isinstance(df[spalte].dtype, pd.CategoricalDtype):
+            df[spalte] = df[spalte].astype(df[spalte].cat.categories.dtype)
+    return df
@@ -0,0 +1,124 @@
+"""
+Schnelles Einlesen von Excel-Dateien (.xlsx).
+
+``pd.read_excel`` baut mit openpyxl zunächst die ganze Tabelle als
+Python-Werte auf und wählt Spalten erst danach aus. Hier wird nur das
+benötigte Blatt zeilenweise im Read-only-Modus gelesen und je Zeile nur die
+benötigten Spalten übernommen. Ist ``python-calamine`` installiert, liest
+pandas damit (Rust, deutlich schneller); schlägt das fehl, wird mit einer
+Warnung im Log (``provisionstool.excel``) auf openpyxl zurückgefallen.
+"""
+import importlib.util
+import logging
+
+import pandas as pd
+
+from utils.instrumentation import messe
+
+logger = logging.getLogger("provisionstool.excel")
+
+# schnellere Engine, falls installiert (optional)
+CALAMINE_VERFUEGBAR = importlib.util.find_spec("python_calamine") is not None
+
+
+def lese_excel(datei, spalten=None, blatt=None, als_text=False):
+    """
+    Ein Blatt einer Excel-Datei als DataFrame lesen (Dateiposition danach beliebig).
+
+    spalten: ``None`` (alle) oder Funktion Kopfzeile → Liste der zu lesenden
+      Spalten, z. B. ``_benoetigte_spalten`` aus ``utils.ingest``
+    blatt: Name oder Index; ``None`` = das Blatt, für das ``spalten`` die
+      meisten Spalten liefert (ohne ``spalten``: das erste Blatt)
+    als_text: alle Werte als ``str`` (leere Zellen bleiben leer)
+
+    Vollständig leere Zeilen werden übersprungen (wie beim CSV-Lesen).
+    """
+    with messe("excel_lesen", engine="calamine" if CALAMINE_VERFUEGBAR else "openpyxl") as m:
+        tabelle = None
+        if CALAMINE_VERFUEGBAR:
+            try:
+                tabelle = _lese_calamine(datei, spalten, blatt, als_text)
+            except Exception as e:
+                logger.warning(
+                    "calamine konnte %s nicht lesen, weiter mit openpyxl: %s",
+                    getattr(datei, "name", "die Excel-Datei"), e,
+                )
+                m["engine"] = "openpyxl"
+        if tabelle is None:
+            datei.seek(0)
+            tabelle = _lese_openpyxl(datei, spalten, blatt, als_text)
+        m["zeilen"] = len(tabelle)
+    return tabelle
+
+
+def _lese_openpyxl(datei, spalten, blatt, als_text):
+    # erst beim ersten Excel-Import laden (spart Startzeit der App)
+    from openpyxl import load_workbook
+
+    buch = load_workbook(datei, read_only=True, data_only=True)
+    try:
+        blaetter = [buch[name] for name in buch.sheetnames]
+        for b in blaetter:
+            # gespeicherte Blattgröße ist bei manchen Exporten falsch (z. B. "A1")
+            b.reset_dimensions()
+        koepfe = [_kopfzeile(next(b.iter_rows(max_row=1, values_only=True), ())) for b in blaetter]
+        i = _waehle_blatt(buch.sheetnames, koepfe, spalten, blatt)
+        kopf = koepfe[i]
+
+        # Spalten in Dateireihenfolge (wie pandas mit ``usecols``)
+        positionen = sorted(kopf.index(name) for name in (spalten(kopf) if spalten else kopf))
+        namen = [kopf[p] for p in positionen]
+        werte = [[] for _ in namen]
+        for zeile in blaetter[i].iter_rows(min_row=2, values_only=True):
+            auswahl = [zeile[p] if p < len(zeile) else None for p in positionen]
+            if all(wert is None for wert in auswahl):
+                continue
+            for liste, wert in zip(werte, auswahl):
+                liste.append(wert)
+    finally:
+        buch.close()
+
+    tabelle = pd.DataFrame({
+        name: pd.Series(liste, dtype=object) for name, liste in zip(namen, werte)
+    })
+    if als_text:
+        return tabelle.apply(lambda spalte: spalte.map(str, na_action="ignore"))
+    return tabelle.infer_objects()
+
+
+def _lese_calamine(datei, spalten, blatt, als_text):
+    buch = pd.ExcelFile(datei, engine="calamine")
+    koepfe = [
+        _kopfzeile(buch.parse(name, nrows=0).columns) for name in buch.sheet_names
+    ]
+    i = _waehle_blatt(buch.sheet_names, koepfe, spalten, blatt)
+    namen = spalten(koepfe[i]) if spalten is not None else None
+    tabelle = buch.parse(
+        buch.sheet_names[i],
+        usecols=namen,
+        dtype=str if als_text else None,
+    )
+    return tabelle.dropna(how="all").reset_index(drop=True)
+
+
+def _kopfzeile(zellen):
+    """Spaltennamen wie pandas (leere Zellen → ``Unnamed: i``, doppelte → ``Name.1``)."""
+    kopf, gesehen = [], {}
+    for i, name in enumerate(zellen):
+        name = f"Unnamed: {i}" if name is None or name == "" else str(name)
+        anzahl = gesehen.get(name, 0)
+        gesehen[name] = anzahl + 1
+        kopf.append(f"{name}.{anzahl}" if anzahl else name)
+    return kopf
+
+
+def _waehle_blatt(blattnamen, koepfe, spalten, blatt):
+    """Index des zu lesenden Blatts."""
+    if isinstance(blatt, int):
+        return blatt
+    if blatt is not None:
+        return blattnamen.index(blatt)
+    if spalten is None:
+        return 0
+    anzahl = [len(spalten(kopf)) for kopf in koepfe]
+    return anzahl.index(max(anzahl))
@@ -0,0 +1,91 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from utils.cache import LRUCache
+from utils.instrumentation import mit_messung
+from utils.pdf_generator import exportiere_zip
+
+# Hintergrund-Threads für PDF/ZIP-Exporte (prozessweit, über Sessions hinweg)
+_AUSFUEHRUNG = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-export")
+
+# Laufende und fertige Aufträge je ID; bleiben über Reruns erhalten, älteste
+# werden verdrängt. Abrufbar nur für den Besitzer (Session), nicht allein über
+# die ID in der URL
+_AUFTRAEGE = LRUCache(max_eintraege=16)
+_SPERRE = threading.Lock()
+
+
+class Exportauftrag:
+    """
+    PDF/ZIP-Export (``exportiere_zip``) in einem Hintergrund-Thread.
+
+    Der Fortschritt (``fertig`` von ``gesamt`` Mitarbeitern, ``aktuell``)
+    wird nach jedem Mitarbeiter aktualisiert und kann jederzeit gelesen
+    werden; ``ergebnis()`` liefert nach Abschluss ``(zip_datei, inhalt)``
+    bzw. löst den Fehler des Exports aus. ``besitzer`` kennzeichnet die
+    Session, die den Export gestartet hat.
+    """
+
+    def __init__(self, df, besitzer, messung=False, **optionen):
+        self.id = uuid.uuid4().hex[:12]
+        self.besitzer = besitzer
+        self.gesamt = int(df["Mitarbeiter"].nunique()) if not df.empty else 0
+        self.fertig = 0
+        self.aktuell = None
+        self.fehler = []
+        # mit PDF-Ablage: Status je Mitarbeiter gegenüber dem letzten Export
+        self.manifest = []
+        self.protokoll = None
+        if optionen.get("ablage") is not None:
+            optionen["manifest"] = self.manifest
+        self._future = _AUSFUEHRUNG.submit(self._ausfuehren, df, messung, optionen)
+
+    def _ausfuehren(self, df, messung, optionen):
+        with (mit_messung() if messung else nullcontext()) as protokoll:
+            self.protokoll = protokoll
+            return exportiere_zip(
+                df, fehler=self.fehler, fortschritt=self._fortschritt, **optionen
+            )
+
+    def _fortschritt(self, fertig, gesamt, mitarbeiter):
+        self.fertig = fertig
+        self.gesamt = gesamt
+        self.aktuell = mitarbeiter
+
+    @property
+    def laeuft(self):
+        return not self._future.done()
+
+    @property
+    def anteil(self):
+        return self.fertig / self.gesamt if self.gesamt else 1.0
+
+    def ergebnis(self):
+        zip_datei, inhalt = self._future.result()
+        zip_datei.seek(0)
+        return zip_datei, inhalt
+
+
+def starte_export(df, besitzer, messung=False, **optionen):
+    """Export im Hintergrund starten; gibt den ``Exportauftrag`` zurück."""
+    auftrag = Exportauftrag(df, besitzer, messung=messung, **optionen)
+    with _SPERRE:
+        _AUFTRAEGE.put(auftrag.id, auftrag)
+    return auftrag
+
+
+def export_auftrag(auftrag_id, besitzer):
+    """
+    Auftrag zur ID, wenn ``besitzer`` ihn gestartet hat (sonst ``None``, auch
+    wenn unbekannt bzw. verdrängt). Eine geteilte oder aus dem Verlauf
+    geöffnete URL gibt so keinen fremden Export preis.
+    """
+    if not auftrag_id:
+        return None
+    with _SPERRE:
+        auftrag = _AUFTRAEGE.get(auftrag_id)
+    if auftrag is None or auftrag.besitzer != besitzer:
+        return None
+    return auftrag
@@ -0,0 +1,80 @@
+"""
+Geldbeträge als ganze Cent (int64).
+
+Beträge werden direkt aus dem Text in Cent überführt, Provisionen mit
+ganzzahliger Arithmetik berechnet und kaufmännisch gerundet
+(ab 0,5 Cent vom Betrag weg). Summen sind damit exakt; ``float``-Euro-Werte
+entstehen nur noch zur Anzeige (``cent / 100``).
+"""
+import numpy as np
+import pandas as pd
+
+# Provisionssätze in Zehntausendstel Prozent (2,5 % → 25000)
+SATZ_SKALA = 10_000
+
+_BETRAG_MUSTER = r"^\s*([+-]?)(\d*)(?:\.(\d*))?\s*$"
+
+
+def _runde_division(zaehler, nenner):
+    """Ganzzahlige Division mit kaufmännischer Rundung (halb vom Betrag weg)."""
+    zaehler = np.asarray(zaehler, dtype=np.int64)
+    return np.sign(zaehler) * ((np.abs(zaehler) + nenner // 2) // nenner)
+
+
+def parse_cent(betrag_text):
+    """
+    Beträge im Format ``1234.56`` (Tausenderpunkte bereits entfernt, Dezimalpunkt)
+    in Cent umwandeln. Mehr als zwei Nachkommastellen werden kaufmännisch
+    gerundet. Nicht lesbare Werte ergeben 0 (wie bisher ``fillna(0.0)``).
+    """
+    teile = pd.Series(betrag_text, dtype=object).astype(str).str.extract(_BETRAG_MUSTER)
+    vorzeichen = np.where(teile[0].to_numpy() == "-", -1, 1)
+    ganz = teile[1].fillna("")
+    nachkomma = teile[2].fillna("")
+
+    gueltig = (ganz.str.len() > 0) | (nachkomma.str.len() > 0)
+    ganz = pd.to_numeric(ganz.where(ganz.str.len() > 0, "0"), errors="coerce")
+    cent = pd.to_numeric(nachkomma.str[:2].str.ljust(2, "0"), errors="coerce")
+    aufrunden = nachkomma.str[2:3].fillna("").isin(list("56789"))
+
+    betrag = (
+        ganz.fillna(0).to_numpy(dtype=np.int64) * 100
+        + cent.fillna(0).to_numpy(dtype=np.int64)
+        + aufrunden.to_numpy(dtype=np.int64)
+    )
+    return np.where(gueltig.to_numpy(), vorzeichen * betrag, 0).astype(np.int64)
+
+
+def euro_zu_cent(euro):
+    """float-Euro-Beträge in Cent (kaufmännisch gerundet, NaN → 0)."""
+    euro = np.nan_to_num(np.asarray(euro, dtype=float), nan=0.0)
+    return (np.sign(euro) * np.floor(np.abs(euro) * 100 + 0.5)).astype(np.int64)
+
+
+def cent_zu_euro(cent):
+    """Cent als float-Euro (nur für Anzeige/Kompatibilität)."""
+    return np.asarray(cent, dtype=np.int64) / 100
+
+
+def satz_skaliert(satz_prozent):
+    """Provisionssatz in Prozent → ganzzahlig skaliert (``SATZ_SKALA``); NaN bleibt NaN."""
+    satz = np.asarray(satz_prozent, dtype=float)
+    return np.round(satz * SATZ_SKALA)
+
+
+def provision_cent(netto_cent, satz_skala):
+    """
+    Provision in Cent = Netto × Satz, kaufmännisch auf ganze Cent gerundet.
+    ``satz_skala`` ist der mit ``satz_skaliert`` umgerechnete Satz (ohne NaN).
+    """
+    zaehler = np.asarray(netto_cent, dtype=np.int64) * np.asarray(satz_skala, dtype=np.int64)
+    return _runde_division(zaehler, 100 * SATZ_SKALA)
+
+
+def format_cent(cent) -> str:
+    """Cent-Betrag als € mit deutschem Dezimalformat (exakt, ohne float-Summen)."""
+    cent = int(cent)
+    vorzeichen = "-" if cent < 0 else ""
+    euro, rest = divmod(abs(cent), 100)
+    s = f"{euro:,d}".replace(",", ".")
+    return f"{vorzeichen}{s},{rest:02d} €"
@@ -0,0 +1,431 @@
+import csv
+import codecs
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.excel import lese_excel
+from utils.geld import cent_zu_euro
+from utils.instrumentation import messe
+from utils.parsing import parse_betrag_cent, parse_datum
+
+# Zielspalte → akzeptierte Spaltennamen im Export (in Prioritätsreihenfolge)
+SPALTEN_ALIASE = {
+    "Rechnungsnummer": ["Rechnungsnummer", "Rechnungsnr."],
+    "Zahlungsdatum": ["Zahlungsdatum", "letztes Bezahldatum"],
+    "Rechnungsdatum": ["Rechnungsdatum"],
+    "Status": ["Status"],
+    "Netto": ["Netto", "Nettobetrag", "Betrag"],
+    "Kunde": ["Kunde"],
+    "Projekt": ["Projekt"],
+    "Fremdleistung": ["Fremdleistung"],
+}
+
+# Standard-Blockgröße für das gestreamte Einlesen
+CHUNKSIZE = 100_000
+
+# Für die Formaterkennung gelesener Dateianfang
+PROBE_BYTES = 16 * 1024
+TRENNZEICHEN = [";", ",", "\t", "|"]
+
+
+def lese_rechnungen(rechnungen_file, fehler=None):
+    """
+    Rechnungsdatei komplett einlesen (CSV ;-getrennt oder Excel) und normalisieren.
+    Eine Liste von Dateien wird über ``lese_rechnungen_mehrere`` zusammengeführt.
+
+    fehler: optionale Liste für nicht lesbare Werte (siehe
+    ``normalisiere_rechnungen``), je Eintrag ergänzt um ``datei``.
+    """
+    if isinstance(rechnungen_file, (list, tuple)):
+        return lese_rechnungen_mehrere(rechnungen_file, fehler=fehler)
+
+    dezimal = None
+    with messe("einlesen", datei="rechnungen") as m:
+        if rechnungen_file.name.endswith(".xlsx"):
+            # nur das Rechnungsblatt und die benötigten Spalten, zeilenweise
+            rechnungen = lese_excel(rechnungen_file, spalten=_benoetigte_spalten)
+        else:
+            # Format aus dem Dateianfang, dann genau ein Lesedurchgang
+            csv_format = erkenne_csv_format(rechnungen_file)
+            dezimal = csv_format["dezimal"]
+            rechnungen = pd.read_csv(
+                rechnungen_file,
+                sep=csv_format["sep"],
+                encoding=csv_format["encoding"],
+                dtype={spalte: str for spalte in csv_format["betrag_spalten"]},
+            )
+        m["zeilen"] = len(rechnungen)
+
+    datei_fehler = [] if fehler is not None else None
+    rechnungen = normalisiere_rechnungen(rechnungen, dezimal=dezimal, fehler=datei_fehler)
+    _mit_dateiname(fehler, datei_fehler, rechnungen_file)
+    return rechnungen
+
+
+def lese_rechnungen_mehrere(rechnungen_files, max_workers=None, fehler=None):
+    """
+    Mehrere Rechnungsdateien (z. B. je Filiale/Monat) parallel einlesen und
+    normalisieren, aneinanderhängen und doppelte Rechnungsnummern entfernen
+    (``dedupliziere_rechnungen``).
+    """
+    max_workers = max_workers or min(len(rechnungen_files), os.cpu_count() or 1) or 1
+    # je Datei eigene Fehlerliste (Threads), danach in Dateireihenfolge anhängen
+    datei_fehler = [[] if fehler is not None else None for _ in rechnungen_files]
+    with messe("einlesen", datei="rechnungen", modus="mehrere", dateien=len(rechnungen_files)) as m:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            teile = list(pool.map(lese_rechnungen, rechnungen_files, datei_fehler))
+        m["zeilen"] = sum(len(t) for t in teile)
+    if fehler is not None:
+        for eintraege in datei_fehler:
+            fehler.extend(eintraege)
+    return dedupliziere_rechnungen(pd.concat(teile, ignore_index=True))
+
+
+def dedupliziere_rechnungen(rechnungen):
+    """
+    Je Rechnungsnummer nur eine Zeile behalten (Reihenfolge bleibt erhalten).
+
+    Maßgeblich ist der neueste Stand: ``Bezahlt`` vor allen anderen Status,
+    dann das spätere Zahlungsdatum, bei Gleichstand die spätere Zeile bzw.
+    Datei. Zeilen ohne Rechnungsnummer bleiben alle erhalten.
+    """
+    with messe("deduplizierung") as m:
+        # Hash-Index über die Rechnungsnummer (Text, damit 123 und "123" gleich sind)
+        nummer = rechnungen["Rechnungsnummer"]
+        codes, _ = pd.factorize(nummer.where(nummer.isna(), nummer.astype(str)))
+        bezahlt = (rechnungen["Status"].astype(str) == "Bezahlt").to_numpy()
+        datum = pd.DatetimeIndex(rechnungen["Zahlungsdatum"]).asi8  # NaT = kleinster Wert
+
+        # je Code die beste Zeile zuletzt sortieren
+        reihenfolge = np.lexsort((np.arange(len(codes)), datum, bezahlt, codes))
+        sortiert = codes[reihenfolge]
+        letzte = np.append(sortiert[1:] != sortiert[:-1], True) | (sortiert < 0)
+        behalten = np.sort(reihenfolge[letzte])
+
+        m["zeilen"] = len(behalten)
+        m["duplikate"] = len(rechnungen) - len(behalten)
+    if len(behalten) == len(rechnungen):
+        return rechnungen
+    return rechnungen.iloc[behalten].reset_index(drop=True)
+
+
+def lese_provisionen(provisionen_file):
+    """Provisionssätze je Mitarbeiter (Excel) einlesen."""
+    with messe("einlesen", datei="provisionen") as m:
+        provisionen = lese_excel(provisionen_file)
+        m["zeilen"] = len(provisionen)
+    return provisionen
+
+
+def lese_rechnungen_gestreamt(
+    rechnungen_file, zeilenfilter=None, chunksize=CHUNKSIZE, fehler=None
+):
+    """
+    Rechnungsdatei blockweise einlesen.
+
+    Es werden nur die benötigten Spalten (inkl. Aliase) mit festem Datentyp
+    ``str`` gelesen. Jeder Block wird sofort normalisiert und – falls
+    ``zeilenfilter`` angegeben ist – gefiltert, sodass nicht benötigte Zeilen
+    nie gemeinsam im Speicher liegen.
+
+    Hinweis: Da keine Typen erraten werden, ist z. B. ``Rechnungsnummer``
+    immer Text, auch wenn die Datei nur Ziffern enthält.
+
+    Bei einer Liste von Dateien wird jede gestreamt eingelesen, der
+    ``zeilenfilter`` aber erst nach der Deduplizierung angewendet (sonst
+    könnte ein älterer Stand einer Rechnung übrig bleiben).
+
+    Nicht lesbare Werte werden vor dem Filtern an ``fehler`` gemeldet.
+    """
+    if isinstance(rechnungen_file, (list, tuple)):
+        rechnungen = dedupliziere_rechnungen(pd.concat(
+            [
+                lese_rechnungen_gestreamt(datei, chunksize=chunksize, fehler=fehler)
+                for datei in rechnungen_file
+            ],
+            ignore_index=True,
+        ))
+        return zeilenfilter(rechnungen) if zeilenfilter is not None else rechnungen
+
+    if rechnungen_file.name.endswith(".xlsx"):
+        # Excel kennt kein chunksize → Spalten/Typen einschränken, einmal filtern
+        rechnungen = lese_excel(rechnungen_file, spalten=_benoetigte_spalten, als_text=True)
+        spalten = list(rechnungen.columns)
+        bloecke = [rechnungen]
+        csv_format = {"dezimal": _erkenne_dezimal(_betrag_werte(rechnungen))}
+    else:
+        csv_format = erkenne_csv_format(rechnungen_file)
+        spalten = _benoetigte_spalten(csv_format["spalten"])
+        bloecke = pd.read_csv(
+            rechnungen_file,
+            sep=csv_format["sep"],
+            encoding=csv_format["encoding"],
+            usecols=spalten,
+            dtype={s: str for s in spalten},
+            chunksize=chunksize,
+        )
+
+    teile = []
+    datei_fehler = [] if fehler is not None else None
+    with messe("einlesen", datei="rechnungen", modus="gestreamt") as m:
+        m["zeilen"] = 0
+        for block in bloecke:
+            m["zeilen"] += len(block)
+            block = normalisiere_rechnungen(
+                block, dezimal=csv_format["dezimal"], fehler=datei_fehler
+            )
+            if zeilenfilter is not None:
+                block = zeilenfilter(block)
+            teile.append(block)
+
+    _mit_dateiname(fehler, datei_fehler, rechnungen_file)
+
+    if not teile:
+        # leere Datei (nur Kopfzeile)
+        return normalisiere_rechnungen(
+            pd.DataFrame({spalte: pd.Series(dtype=str) for spalte in spalten}),
+            dezimal=csv_format["dezimal"],
+        )
+
+    return pd.concat(teile, ignore_index=True)
+
+
+def _benoetigte_spalten(vorhandene_spalten):
+    """Alle vorhandenen Spalten, die über ``SPALTEN_ALIASE`` benötigt werden."""
+    return list(spalten_zuordnung(vorhandene_spalten))
+
+
+def spalten_zuordnung(vorhandene_spalten):
+    """
+    Vorhandene Spaltennamen → Zielspalte laut ``SPALTEN_ALIASE``.
+
+    Verglichen wird ohne Groß-/Kleinschreibung, Leer- und Satzzeichen
+    (``Rechnungsnr.`` = ``rechnungsnr``); je Zielspalte gilt der erste
+    Alias, der in der Datei vorkommt.
+    """
+    nach_schluessel = {}
+    for name in vorhandene_spalten:
+        nach_schluessel.setdefault(_spaltenschluessel(name), name)
+
+    zuordnung = {}
+    for ziel, aliase in SPALTEN_ALIASE.items():
+        for alias in aliase:
+            name = nach_schluessel.get(_spaltenschluessel(alias))
+            if name is not None and name not in zuordnung:
+                zuordnung[name] = ziel
+                break
+    return zuordnung
+
+
+def _spaltenschluessel(name):
+    return "".join(zeichen for zeichen in str(name).lower() if zeichen.isalnum())
+
+
+def erkenne_csv_format(datei, probe_bytes=PROBE_BYTES):
+    """
+    Format einer CSV-Datei aus den ersten ``probe_bytes`` Bytes bestimmen
+    (Dateiposition bleibt bei 0):
+
+      - ``encoding``: UTF-8 (mit/ohne BOM), sonst cp1252
+      - ``sep``: Trennzeichen mit gleichbleibender Spaltenzahl je Zeile
+      - ``spalten``: Kopfzeile; ``betrag_spalten``: Spalten, die auf Netto abgebildet werden
+      - ``dezimal``: ``","`` (1.234,56) oder ``"."`` (1,234.56) anhand der Nettowerte
+
+    Ohne eindeutige Hinweise gilt das bisherige Format (``;``, UTF-8, Dezimalkomma).
+    """
+    datei.seek(0)
+    probe = datei.read(probe_bytes)
+    datei.seek(0)
+    abgeschnitten = len(probe) >= probe_bytes
+
+    encoding = _erkenne_encoding(probe, abgeschnitten)
+    text = probe.decode(encoding, errors="ignore")
+    zeilen = text.splitlines()
+    if abgeschnitten and len(zeilen) > 1:
+        zeilen = zeilen[:-1]  # letzte Zeile ist evtl. unvollständig
+
+    sep = _erkenne_trennzeichen(zeilen)
+    tabelle = [zeile for zeile in csv.reader(zeilen, delimiter=sep) if zeile]
+    spalten = tabelle[0] if tabelle else []
+    betrag_spalten = [
+        name for name, ziel in spalten_zuordnung(spalten).items() if ziel == "Netto"
+    ]
+
+    werte = []
+    if betrag_spalten:
+        i = spalten.index(betrag_spalten[0])
+        werte = [zeile[i] for zeile in tabelle[1:] if len(zeile) > i]
+
+    return {
+        "sep": sep,
+        "encoding": encoding,
+        "spalten": spalten,
+        "betrag_spalten": betrag_spalten,
+        "dezimal": _erkenne_dezimal(werte),
+    }
+
+
+def _erkenne_encoding(probe, abgeschnitten):
+    if probe.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        probe.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # am Probenende abgeschnittenes Mehrbyte-Zeichen ist kein Fehler
+        if not (abgeschnitten and e.start >= len(probe) - 3):
+            return "cp1252"
+    return "utf-8"
+
+
+def _erkenne_trennzeichen(zeilen):
+    """Trennzeichen mit den meisten Spalten bei gleicher Spaltenzahl in (fast) allen Zeilen."""
+    bestes, beste_spalten = ";", 1
+    for sep in TRENNZEICHEN:
+        anzahl = [len(zeile) for zeile in csv.reader(zeilen, delimiter=sep) if zeile]
+        if not anzahl or anzahl[0] < 2:
+            continue
+        gleich = sum(1 for n in anzahl if n == anzahl[0])
+        if gleich >= 0.9 * len(anzahl) and anzahl[0] > beste_spalten:
+            bestes, beste_spalten = sep, anzahl[0]
+    return bestes
+
+
+_NUR_TAUSENDERPUNKTE = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+
+
+def _erkenne_dezimal(werte):
+    """Dezimaltrennzeichen ("," oder ".") nach Mehrheit eindeutiger Beträge."""
+    komma = punkt = 0
+    for wert in werte:
+        wert = re.sub(r"[^\d,.\-]", "", str(wert))
+        if "," in wert and "." in wert:
+            if wert.rfind(",") > wert.rfind("."):
+                komma += 1
+            else:
+                punkt += 1
+        elif "," in wert:
+            komma += 1
+        elif "." in wert and not _NUR_TAUSENDERPUNKTE.match(wert):
+            punkt += 1
+    return "." if punkt > komma else ","
+
+
+def _betrag_werte(rechnungen, anzahl=1000):
+    """Stichprobe der Netto-Texte (für die Erkennung des Dezimaltrennzeichens)."""
+    for name, ziel in spalten_zuordnung(rechnungen.columns).items():
+        if ziel == "Netto":
+            werte = rechnungen[name].dropna()
+            # Zahlzellen (Excel) sagen nichts über das Textformat aus
+            werte = werte[werte.map(lambda wert: isinstance(wert, str))]
+            return werte.head(anzahl).tolist()
+    return []
+
+
+def normalisiere_rechnungen(rechnungen, dezimal=None, fehler=None):
+    """
+    Spalten vereinheitlichen und typisieren:
+      - Aliase umbenennen (Rechnungsnr., letztes Bezahldatum, …; ``spalten_zuordnung``)
+      - Pflichtspalten prüfen, optionale Spalten ergänzen
+      - Netto in Cent (Netto_Cent) und float (Netto); Texte mit Dezimaltrennzeichen
+        ``dezimal`` (``","`` deutsch, ``"."`` englisch, ``None`` = aus den Werten
+        erkennen), Zahlenspalten (Excel) direkt
+      - Zahlungsdatum / Rechnungsdatum als datetime (``utils.parsing``)
+      - Flag Ist_Fremdleistung
+
+    fehler: optionale Liste, an die leere/nicht lesbare Beträge und nicht
+    lesbare Datumswerte als ``{"zeile", "spalte", "wert"}`` angehängt werden
+    (sie ergeben weiterhin 0 Cent bzw. NaT).
+    """
+    with messe("spalten_aliase") as m:
+        # -------------------------
+        # Spalten aufräumen / umbenennen
+        # -------------------------
+        umbenennung = {
+            name: ziel for name, ziel in spalten_zuordnung(rechnungen.columns).items()
+            if name != ziel
+        }
+        if umbenennung:
+            rechnungen = rechnungen.rename(columns=umbenennung)
+
+        # Rechnungsnummer
+        if "Rechnungsnummer" not in rechnungen.columns:
+            raise ValueError("Spalte 'Rechnungsnummer' bzw. 'Rechnungsnr.' nicht gefunden.")
+
+        # Zahlungsdatum / Rechnungsdatum
+        if "Zahlungsdatum" not in rechnungen.columns:
+            raise ValueError("Spalte 'Zahlungsdatum' oder 'letztes Bezahldatum' nicht gefunden.")
+
+        # Optional: Rechnungsdatum (für Filter bei offenen Rechnungen)
+        has_rech_datum = False
+        if "Rechnungsdatum" in rechnungen.columns:
+            has_rech_datum = True
+
+        # Status
+        if "Status" not in rechnungen.columns:
+            raise ValueError("Spalte 'Status' nicht gefunden.")
+
+        # Kunde / Projekt ggf. ergänzen
+        for col in ["Kunde", "Projekt"]:
+            if col not in rechnungen.columns:
+                rechnungen[col] = ""
+
+        # Fremdleistung-Spalte optional
+        if "Fremdleistung" not in rechnungen.columns:
+            rechnungen["Fremdleistung"] = ""
+
+        # Netto aus deutschem Format in Cent / float bringen
+        if "Netto" not in rechnungen.columns:
+            raise ValueError("Spalte 'Netto' nicht gefunden.")
+        m["zeilen"] = len(rechnungen)
+
+    with messe("netto_datum_parsing") as m:
+        # Cent (int64) sind maßgeblich, Netto (float) nur für Anzeige
+        if dezimal is None:
+            dezimal = _erkenne_dezimal(_betrag_werte(rechnungen))
+        netto_cent, ungueltig = parse_betrag_cent(rechnungen["Netto"], dezimal)
+        _melde_parsefehler(fehler, rechnungen, "Netto", ungueltig)
+        rechnungen["Netto_Cent"] = netto_cent
+        rechnungen["Netto"] = cent_zu_euro(netto_cent)
+
+        # Datum parsen (TT.MM.JJJJ, sonst ISO; leere Werte bleiben NaT)
+        datumsspalten = ["Zahlungsdatum", "Rechnungsdatum"] if has_rech_datum else ["Zahlungsdatum"]
+        for spalte in datumsspalten:
+            datum, ungueltig = parse_datum(rechnungen[spalte])
+            _melde_parsefehler(fehler, rechnungen, spalte, ungueltig)
+            rechnungen[spalte] = datum
+
+        # Flag Fremdleistung
+        rechnungen["Ist_Fremdleistung"] = (
+            rechnungen["Fremdleistung"]
+            .fillna("")
+            .astype(str)
+            .str.strip()
+            .str.lower()
+            .isin(["ja", "yes", "y"])
+        )
+        m["zeilen"] = len(rechnungen)
+
+    return rechnungen
+
+
+def _mit_dateiname(fehler, datei_fehler, datei):
+    if fehler is not None:
+        name = getattr(datei, "name", "")
+        fehler.extend({"datei": name, **eintrag} for eintrag in datei_fehler)
+
+
+def _melde_parsefehler(fehler, rechnungen, spalte, ungueltig):
+    """Nicht lesbare Werte als ``{"zeile", "spalte", "wert"}`` an ``fehler`` anhängen."""
+    if fehler is None or not ungueltig.any():
+        return
+    betroffen = rechnungen.loc[ungueltig, spalte]
+    # Zeilennummer in der Datei (Kopfzeile = 1), bei Blöcken fortlaufend
+    for index, wert in betroffen.items():
+        fehler.append({
+            "zeile": index + 2 if isinstance(index, (int, np.integer)) else index,
+            "spalte": spalte,
+            "wert": "" if pd.isna(wert) else str(wert),
+        })
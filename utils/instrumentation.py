@@ -0,0 +1,124 @@
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+logger = logging.getLogger("provisionstool.messung")
+
+# Aktives Messprotokoll der laufenden Berechnung (je Streamlit-Session/Thread getrennt)
+_PROTOKOLL = ContextVar("messprotokoll", default=None)
+
+
+class Messprotokoll:
+    """
+    Sammelt je Verarbeitungsstufe Laufzeit, Zeilenanzahl und (optional)
+    Spitzen-Speicher über ``tracemalloc``.
+
+    Jeder Eintrag wird zusätzlich als JSON-Zeile über den Logger
+    ``provisionstool.messung`` ausgegeben.
+
+    Hinweis: ``tracemalloc`` misst prozessweit; laufen mehrere Messungen
+    gleichzeitig (mehrere Sessions), sind die Speicherwerte nur Richtwerte.
+    """
+
+    def __init__(self, speicher=True):
+        self.speicher = speicher
+        self.eintraege = []
+        self._stapel = []  # Spitzen-Speicher offener (äußerer) Stufen
+        self._tracemalloc_gestartet = False
+
+    def starten(self):
+        if self.speicher and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_gestartet = True
+
+    def beenden(self):
+        if self._tracemalloc_gestartet:
+            tracemalloc.stop()
+            self._tracemalloc_gestartet = False
+
+    @contextmanager
+    def stufe(self, name, **details):
+        eintrag = {"stufe": name, "zeilen": None, **details}
+        speicher = self.speicher and tracemalloc.is_tracing()
+
+        if speicher:
+            # bisherige Spitze an die äußere Stufe weitergeben, dann neu messen
+            if self._stapel:
+                self._stapel[-1] = max(self._stapel[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._stapel.append(0)
+
+        start = time.perf_counter()
+        try:
+            yield eintrag
+        finally:
+            eintrag["sekunden"] = round(time.perf_counter() - start, 6)
+            if speicher:
+                spitze = max(self._stapel.pop(), tracemalloc.get_traced_memory()[1])
+                eintrag["spitze_bytes"] = spitze
+                if self._stapel:
+                    self._stapel[-1] = max(self._stapel[-1], spitze)
+            self.eintraege.append(eintrag)
+            logger.info(json.dumps(eintrag, default=str, ensure_ascii=False))
+
+    def als_dataframe(self):
+        return pd.DataFrame(self.eintraege)
+
+    def zusammenfassung(self):
+        """Summen je Stufe (Laufzeit, Zeilen, max. Spitzen-Speicher, Anzahl Aufrufe)."""
+        df = self.als_dataframe()
+        if df.empty:
+            return df
+        agg = {"sekunden": "sum", "zeilen": "sum", "stufe": "size"}
+        if "spitze_bytes" in df.columns:
+            agg["spitze_bytes"] = "max"
+        zusammen = df.groupby("stufe", sort=False).agg(agg)
+        return zusammen.rename(columns={"stufe": "aufrufe"}).reset_index()
+
+
+def aktiviere_json_log(stream=None):
+    """Messwerte als JSON-Zeilen ausgeben (StreamHandler, nur einmal angelegt)."""
+    if not any(getattr(h, "_messung", False) for h in logger.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler._messung = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+@contextmanager
+def mit_messung(speicher=True):
+    """
+    Messung für den umschlossenen Block aktivieren::
+
+        with mit_messung() as protokoll:
+            berechne_provisionen(...)
+        protokoll.zusammenfassung()
+    """
+    protokoll = Messprotokoll(speicher=speicher)
+    token = _PROTOKOLL.set(protokoll)
+    protokoll.starten()
+    try:
+        yield protokoll
+    finally:
+        protokoll.beenden()
+        _PROTOKOLL.reset(token)
+
+
+@contextmanager
+def messe(name, **details):
+    """
+    Stufe messen, falls gerade ein Messprotokoll aktiv ist (sonst ohne Kosten).
+    Liefert ein dict, in das z. B. ``zeilen`` eingetragen werden kann.
+    """
+    protokoll = _PROTOKOLL.get()
+    if protokoll is None:
+        yield {}
+        return
+    with protokoll.stufe(name, **details) as eintrag:
+        yield eintrag
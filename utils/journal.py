@@ -0,0 +1,169 @@
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from utils.geld import cent_zu_euro
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS abgerechnet (
+    mitarbeiter       TEXT    NOT NULL,
+    rechnungsnummer   TEXT    NOT NULL,
+    lauf_id           TEXT    NOT NULL,
+    kunde             TEXT,
+    projekt           TEXT,
+    netto_cent        INTEGER NOT NULL,
+    provision_cent    INTEGER NOT NULL,
+    zahlungsdatum     TEXT,
+    ist_fremdleistung INTEGER NOT NULL,
+    PRIMARY KEY (mitarbeiter, rechnungsnummer)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_abgerechnet_lauf ON abgerechnet (lauf_id);
+CREATE TABLE IF NOT EXISTS laeufe (
+    lauf_id        TEXT PRIMARY KEY,
+    erstellt_am    TEXT NOT NULL,
+    bezeichnung    TEXT
+);
+"""
+
+
+class Abrechnungsjournal:
+    """
+    Lokales SQLite-Journal bereits ausgezahlter Provisionen,
+    Schlüssel (Mitarbeiter, Rechnungsnummer).
+
+    - ``nur_neue``: bereits abgerechnete bezahlte Rechnungen aus einem
+      Ergebnis entfernen (verbuchte Schlüssel der vorkommenden Rechnungsnummern
+      laden, Anti-Join in pandas)
+    - ``verbuche``: bezahlte Zeilen eines Ergebnisses als abgerechnet speichern
+    - ``lauf_laden``: Ergebnis eines früheren Laufs ohne Quelldateien wiederherstellen
+
+    Offene Rechnungen (Prämienvorschau) werden nie verbucht und bleiben immer
+    im Ergebnis.
+    """
+
+    def __init__(self, pfad):
+        self.pfad = str(pfad)
+        with closing(self._verbinden()) as con, con:
+            con.executescript(_SCHEMA)
+
+    def _verbinden(self):
+        # je Aufruf eigene Verbindung: Streamlit-Reruns laufen in wechselnden Threads
+        return sqlite3.connect(self.pfad, timeout=30)
+
+    def nur_neue(self, df):
+        """Ergebnis ohne bereits abgerechnete (bezahlte) Zeilen."""
+        if df is None or df.empty:
+            return df
+
+        bezahlt = (df["Status"].astype(str) == "Bezahlt").to_numpy()
+        if not bezahlt.any():
+            return df
+        nummern = df["Rechnungsnummer"].astype(str)
+
+        # nur die verbuchten Schlüssel der vorkommenden Rechnungsnummern laden
+        # (je Rechnung einmal, nicht je Mitarbeiter × Rechnung)
+        with closing(self._verbinden()) as con:
+            if con.execute("SELECT 1 FROM abgerechnet LIMIT 1").fetchone() is None:
+                return df
+            con.execute("CREATE TEMP TABLE nummern (rechnungsnummer TEXT PRIMARY KEY)")
+            con.executemany(
+                "INSERT INTO nummern VALUES (?)",
+                ((n,) for n in nummern[bezahlt].unique()),
+            )
+            bekannt = pd.read_sql_query(
+                "SELECT a.mitarbeiter, a.rechnungsnummer FROM abgerechnet a "
+                "JOIN nummern n ON n.rechnungsnummer = a.rechnungsnummer",
+                con,
+            )
+        if bekannt.empty:
+            return df
+
+        # Anti-Join auf (Mitarbeiter, Rechnungsnummer), nur für betroffene Rechnungen
+        positionen = np.flatnonzero(bezahlt & nummern.isin(bekannt["rechnungsnummer"].unique()).to_numpy())
+        paare = pd.MultiIndex.from_arrays([
+            df["Mitarbeiter"].iloc[positionen].astype(str).to_numpy(),
+            nummern.to_numpy()[positionen],
+        ])
+        abgerechnet = paare.isin(pd.MultiIndex.from_frame(bekannt))
+
+        behalten = np.ones(len(df), dtype=bool)
+        behalten[positionen[abgerechnet]] = False
+        return df[behalten]
+
+    def verbuche(self, df, bezeichnung=None):
+        """
+        Bezahlte Zeilen als abgerechnet speichern. Gibt die ``lauf_id`` zurück
+        (``None`` ohne bezahlte Zeilen; dann wird kein Lauf angelegt).
+        Bereits verbuchte Schlüssel lösen einen ``ValueError`` aus (Doppelauszahlung).
+        """
+        bezahlt = df[df["Status"].astype(str) == "Bezahlt"]
+        if bezahlt.empty:
+            return None
+        lauf_id = uuid.uuid4().hex[:12]
+        zahlungsdatum = pd.to_datetime(bezahlt["Zahlungsdatum"]).dt.strftime("%Y-%m-%d")
+
+        zeilen = list(zip(
+            bezahlt["Mitarbeiter"].astype(str),
+            bezahlt["Rechnungsnummer"].astype(str),
+            [lauf_id] * len(bezahlt),
+            bezahlt["Kunde"].astype(str),
+            bezahlt["Projekt"].astype(str),
+            bezahlt["Netto_Cent"].astype("int64").tolist(),
+            bezahlt["Provision_Cent"].astype("int64").tolist(),
+            [d if isinstance(d, str) else None for d in zahlungsdatum],
+            bezahlt["Ist_Fremdleistung"].astype(bool).astype(int).tolist(),
+        ))
+
+        with closing(self._verbinden()) as con, con:
+            con.execute(
+                "INSERT INTO laeufe VALUES (?, ?, ?)",
+                (lauf_id, datetime.now().isoformat(timespec="seconds"), bezeichnung),
+            )
+            try:
+                con.executemany(
+                    "INSERT INTO abgerechnet VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", zeilen
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(
+                    "Mindestens eine Rechnung ist für diesen Mitarbeiter bereits abgerechnet."
+                )
+        return lauf_id
+
+    def laeufe(self):
+        """Übersicht aller Läufe (neueste zuerst) mit Anzahl und Prämiensumme."""
+        with closing(self._verbinden()) as con:
+            df = pd.read_sql_query(
+                "SELECT l.lauf_id, l.erstellt_am, l.bezeichnung, "
+                "COUNT(a.rechnungsnummer) AS zeilen, "
+                "COALESCE(SUM(a.provision_cent), 0) AS provision_cent "
+                "FROM laeufe l LEFT JOIN abgerechnet a ON a.lauf_id = l.lauf_id "
+                "GROUP BY l.lauf_id ORDER BY l.erstellt_am DESC",
+                con,
+            )
+        df["Provision"] = cent_zu_euro(df.pop("provision_cent"))
+        return df
+
+    def lauf_laden(self, lauf_id):
+        """Abgerechnete Zeilen eines Laufs im Ergebnisformat (für erneute PDF-Erzeugung)."""
+        with closing(self._verbinden()) as con:
+            df = pd.read_sql_query(
+                "SELECT * FROM abgerechnet WHERE lauf_id = ? ORDER BY mitarbeiter, rechnungsnummer",
+                con,
+                params=(lauf_id,),
+            )
+        return pd.DataFrame({
+            "Mitarbeiter": df["mitarbeiter"],
+            "Rechnungsnummer": df["rechnungsnummer"],
+            "Kunde": df["kunde"],
+            "Projekt": df["projekt"],
+            "Netto": cent_zu_euro(df["netto_cent"]),
+            "Provision": cent_zu_euro(df["provision_cent"]),
+            "Zahlungsdatum": pd.to_datetime(df["zahlungsdatum"]),
+            "Status": "Bezahlt",
+            "Ist_Fremdleistung": df["ist_fremdleistung"].astype(bool),
+            "Netto_Cent": df["netto_cent"].astype("int64"),
+            "Provision_Cent": df["provision_cent"].astype("int64"),
+        })
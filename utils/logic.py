@@ -1,189 +1,238 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pandas.tseries.offsets import DateOffset
+from utils.cache import lade_provisionen, lade_zeitraum_index
+from utils.geld import cent_zu_euro, euro_zu_cent, provision_cent
+from utils.ingest import lese_provisionen, lese_rechnungen, lese_rechnungen_gestreamt
+from utils.instrumentation import messe
+from utils.saetze import Satztabelle, rechnungsklassen
+from utils.szenarien import berechne_szenarien
+
+ERGEBNIS_SPALTEN = [
+    "Mitarbeiter",
+    "Rechnungsnummer",
+    "Kunde",
+    "Projekt",
+    "Netto",
+    "Provision",
+    "Zahlungsdatum",
+    "Status",
+    "Ist_Fremdleistung",
+    "Netto_Cent",
+    "Provision_Cent",
+]
+
+
+def berechne_provisionen(
+    rechnungen_file, provisionen_file, monate_rueckblick, chunksize=None, cache=False,
+    journal=None, fehler=None,
+):
+    """
+    Provisionen je Mitarbeiter berechnen.
+
+    chunksize: wenn gesetzt, wird die Rechnungsdatei gestreamt eingelesen
+    (nur benötigte Spalten, Zeitraumfilter je Block), siehe
+    ``utils.ingest.lese_rechnungen_gestreamt``.
+    cache: normalisierte Rechnungen und Provisionssätze über den Inhalts-Hash
+    der Dateien wiederverwenden (``utils.cache``); der Zeitraumfilter läuft
+    dann über einen vorsortierten ``utils.zeitraum.ZeitraumIndex``.
+    journal: ``utils.journal.Abrechnungsjournal``; bereits abgerechnete
+    bezahlte Rechnungen je Mitarbeiter werden aus dem Ergebnis entfernt.
+    fehler: optionale Liste, an die nicht lesbare Beträge/Datumswerte der
+    Rechnungsdatei angehängt werden (``utils.ingest.normalisiere_rechnungen``).
+    """
+    cutoff_date = datetime.now() - DateOffset(months=monate_rueckblick)
 
-def berechne_provisionen(rechnungen_file, provisionen_file, monate_rueckblick):
-    # -------------------------
-    # Rechnungen einlesen (CSV ;-getrennt, deutsches Format)
-    # -------------------------
-    if rechnungen_file.name.endswith(".xlsx"):
-        rechnungen = pd.read_excel(rechnungen_file)
-    else:
-        rechnungen = pd.read_csv(rechnungen_file, sep=";", encoding="utf-8")
+    if cache:
+        rechnungen = _gefiltert_aus_cache(rechnungen_file, cutoff_date, fehler)
+        return _berechne_gefiltert(rechnungen, lade_provisionen(provisionen_file), journal)
 
     # -------------------------
-    # Spalten aufräumen / umbenennen
+    # Rechnungen einlesen + normalisieren
     # -------------------------
-    # Rechnungsnummer
-    if "Rechnungsnummer" in rechnungen.columns:
-        pass
-    elif "Rechnungsnr." in rechnungen.columns:
-        rechnungen = rechnungen.rename(columns={"Rechnungsnr.": "Rechnungsnummer"})
-    else:
-        raise ValueError("Spalte 'Rechnungsnummer' bzw. 'Rechnungsnr.' nicht gefunden.")
-
-    # Zahlungsdatum / Rechnungsdatum
-    if "Zahlungsdatum" in rechnungen.columns:
-        pass
-    elif "letztes Bezahldatum" in rechnungen.columns:
-        rechnungen = rechnungen.rename(columns={"letztes Bezahldatum": "Zahlungsdatum"})
-    else:
-        raise ValueError("Spalte 'Zahlungsdatum' oder 'letztes Bezahldatum' nicht gefunden.")
-
-    # Optional: Rechnungsdatum (für Filter bei offenen Rechnungen)
-    has_rech_datum = False
-    if "Rechnungsdatum" in rechnungen.columns:
-        has_rech_datum = True
-
-    # Status
-    if "Status" not in rechnungen.columns:
-        raise ValueError("Spalte 'Status' nicht gefunden.")
-
-    # Kunde / Projekt ggf. ergänzen
-    for col in ["Kunde", "Projekt"]:
-        if col not in rechnungen.columns:
-            rechnungen[col] = ""
-
-    # Fremdleistung-Spalte optional
-    if "Fremdleistung" not in rechnungen.columns:
-        rechnungen["Fremdleistung"] = ""
-
-    # Netto aus deutschem Format in float bringen
-    if "Netto" not in rechnungen.columns:
-        raise ValueError("Spalte 'Netto' nicht gefunden.")
-
-    netto_str = (
-        rechnungen["Netto"]
-        .astype(str)
-        .str.replace(".", "", regex=False)   # Tausenderpunkte löschen
-        .str.replace(",", ".", regex=False)  # Komma -> Punkt
-    )
-    rechnungen["Netto"] = pd.to_numeric(netto_str, errors="coerce").fillna(0.0)
-
-    # Datum parsen (deutsches Format)
-    rechnungen["Zahlungsdatum"] = pd.to_datetime(
-        rechnungen["Zahlungsdatum"], errors="coerce", dayfirst=True
-    )
-    if has_rech_datum:
-        rechnungen["Rechnungsdatum"] = pd.to_datetime(
-            rechnungen["Rechnungsdatum"], errors="coerce", dayfirst=True
+    if chunksize:
+        rechnungen = lese_rechnungen_gestreamt(
+            rechnungen_file,
+            zeilenfilter=lambda block: filtere_zeitraum(block, cutoff_date),
+            chunksize=chunksize,
+            fehler=fehler,
         )
-
-    # Flag Fremdleistung
-    rechnungen["Ist_Fremdleistung"] = (
-        rechnungen["Fremdleistung"]
-        .fillna("")
-        .astype(str)
-        .str.strip()
-        .str.lower()
-        .isin(["ja", "yes", "y"])
-    )
+    else:
+        rechnungen = filtere_zeitraum(lese_rechnungen(rechnungen_file, fehler), cutoff_date)
 
     # -------------------------
     # Provisionen einlesen
     # -------------------------
-    provisionen = pd.read_excel(provisionen_file)
+    provisionen = lese_provisionen(provisionen_file)
 
-    # -------------------------
-    # Filter: Zeitraum
-    # - Bezahlte: nach Zahlungsdatum
-    # - Offene: nach Rechnungsdatum (falls vorhanden), sonst ohne Datumsfilter
-    # -------------------------
+    return _berechne_gefiltert(rechnungen, provisionen, journal)
+
+
+def berechne_provisionen_aus_tabellen(rechnungen, provisionen, monate_rueckblick, journal=None):
+    """
+    Provisionen aus bereits eingelesenen Tabellen berechnen.
+    ``rechnungen`` muss normalisiert sein (``utils.ingest.normalisiere_rechnungen``).
+    """
     cutoff_date = datetime.now() - DateOffset(months=monate_rueckblick)
+    return _berechne_gefiltert(filtere_zeitraum(rechnungen, cutoff_date), provisionen, journal)
 
-    status = rechnungen["Status"].astype(str)
 
-    mask_bezahlt = (status == "Bezahlt") & (rechnungen["Zahlungsdatum"] >= cutoff_date)
+def vergleiche_szenarien(rechnungen_file, provisionen_file, szenarien, monate_rueckblick):
+    """
+    Was-wäre-wenn-Vergleich: Auszahlung (bezahlte Rechnungen) je Mitarbeiter
+    mit den aktuellen Sätzen (Spalte ``Aktuell``) und je Szenario
+    (``szenarien``: Name → Provisionstabelle). Die Rechnungen werden nur
+    einmal eingelesen und gefiltert (``utils.cache``), siehe
+    ``utils.szenarien.berechne_szenarien``.
+    """
+    cutoff_date = datetime.now() - DateOffset(months=monate_rueckblick)
+    rechnungen = _gefiltert_aus_cache(rechnungen_file, cutoff_date)
+    alle = {"Aktuell": lade_provisionen(provisionen_file), **szenarien}
+    with messe("szenarien", anzahl=len(alle)) as m:
+        vergleich = berechne_szenarien(rechnungen, alle)
+        m["zeilen"] = len(rechnungen)
+    return vergleich
 
-    if has_rech_datum:
-        mask_offen = (status != "Bezahlt") & (rechnungen["Rechnungsdatum"] >= cutoff_date)
-    else:
-        # wenn kein Rechnungsdatum vorhanden ist → alle offenen berücksichtigen
-        mask_offen = (status != "Bezahlt")
 
-    rechnungen = rechnungen[mask_bezahlt | mask_offen].copy()
+def _gefiltert_aus_cache(rechnungen_file, cutoff_date, fehler=None):
+    """Zeitraumfilter über den zwischengespeicherten ``ZeitraumIndex``."""
+    index = lade_zeitraum_index(rechnungen_file, fehler=fehler)
+    with messe("zeitraumfilter", modus="index") as m:
+        rechnungen = index.filtern(cutoff_date)
+        m["zeilen"] = len(rechnungen)
+    return rechnungen
+
 
+def _berechne_gefiltert(rechnungen, provisionen, journal=None):
     if rechnungen.empty:
-        return pd.DataFrame(
-            columns=[
-                "Mitarbeiter",
-                "Rechnungsnummer",
-                "Kunde",
-                "Projekt",
-                "Netto",
-                "Provision",
-                "Zahlungsdatum",
-                "Status",
-                "Ist_Fremdleistung",
-            ]
-        )
+        return pd.DataFrame(columns=ERGEBNIS_SPALTEN)
 
     # -------------------------
-    # Provisionslogik pro Mitarbeiter
+    # Provisionslogik (vektorisiert über alle Mitarbeiter)
     # -------------------------
-    alle = []
+    with messe("provisionsberechnung") as m:
+        result = _berechne_provisionen_vektorisiert(rechnungen, provisionen)
+        m["zeilen"] = len(result)
+
+    if journal is not None:
+        with messe("journal_abgleich") as m:
+            result = journal.nur_neue(result).reset_index(drop=True)
+            m["zeilen"] = len(result)
+    return result
+
+
+def filtere_zeitraum(rechnungen, cutoff_date):
+    """
+    Filter: Zeitraum
+    - Bezahlte: nach Zahlungsdatum
+    - Offene: nach Rechnungsdatum (falls vorhanden), sonst ohne Datumsfilter
+    """
+    with messe("zeitraumfilter") as m:
+        status = rechnungen["Status"].astype(str)
+
+        mask_bezahlt = (status == "Bezahlt") & (rechnungen["Zahlungsdatum"] >= cutoff_date)
+
+        if "Rechnungsdatum" in rechnungen.columns:
+            mask_offen = (status != "Bezahlt") & (rechnungen["Rechnungsdatum"] >= cutoff_date)
+        else:
+            # wenn kein Rechnungsdatum vorhanden ist → alle offenen berücksichtigen
+            mask_offen = (status != "Bezahlt")
+
+        gefiltert = rechnungen[mask_bezahlt | mask_offen].copy()
+        m["zeilen"] = len(gefiltert)
+    return gefiltert
+
+
+def _berechne_provisionen_vektorisiert(rechnungen, provisionen):
+    """
+    Berechnet die Provisionen aller Mitarbeiter in einem Durchgang.
+
+    Statt die Rechnungen je Mitarbeiter zu kopieren, werden nur Indexvektoren
+    (Mitarbeiter-Zeile × Rechnungs-Zeile) der tatsächlich provisionsrelevanten
+    Kombinationen aufgebaut. Ergebnis und Zeilenreihenfolge entsprechen der
+    früheren Schleife über ``provisionen.iterrows()``: Mitarbeiter in der
+    Reihenfolge der Provisionstabelle, je Mitarbeiter die Rechnungen in
+    Eingangsreihenfolge, nur Zeilen mit Provision > 0.
+
+    Gerechnet wird in ganzen Cent (``utils.geld``): Provision_Cent =
+    Netto_Cent × Satz, kaufmännisch gerundet; ``Provision`` ist Provision_Cent / 100.
+
+    Versionierte/gestaffelte Sätze (``utils.saetze.Satztabelle``) gelten je
+    Kontext aus Datumsabschnitt und Betragsstufe des Mitarbeiters; die
+    Indexvektoren werden je ``Satzraster`` gebildet. Mitarbeiter stehen dann
+    in der Reihenfolge ihres ersten Auftretens in der Provisionstabelle.
+    """
+    saetze = Satztabelle(provisionen)
+    mitarbeiter = saetze.mitarbeiter
+
+    if "Netto_Cent" in rechnungen.columns:
+        netto = rechnungen["Netto_Cent"].to_numpy(dtype=np.int64)
+    else:
+        netto = euro_zu_cent(rechnungen["Netto"])
+    ist_fremd = rechnungen["Ist_Fremdleistung"].to_numpy(dtype=bool)
+    stichtage = saetze.stichtage(rechnungen)
+
+    # Rechnungsklassen: Eigen/Fremd × Vorzeichen des Nettobetrags
+    klasse = rechnungsklassen(netto, ist_fremd)
+    relevant = klasse >= 0
+
+    ma_teile, re_teile, satz_teile = [], [], []
+    for raster in saetze.raster:
+        kontext = raster.kontexte(stichtage, netto)
+        schluessel = np.where(relevant, kontext * 4 + klasse, 0)
+
+        # Je Mitarbeiter die zulässigen (Kontext, Klasse)-Paare als Muster
+        # (NaN-Sätze: Vergleich ist False → keine Provision)
+        erlaubt = np.empty((len(raster.mitarbeiter), raster.anzahl_kontexte * 4), dtype=bool)
+        erlaubt[:, 0::4] = raster.satz_eigen > 0
+        erlaubt[:, 1::4] = raster.satz_eigen < 0
+        erlaubt[:, 2::4] = raster.satz_fremd > 0
+        erlaubt[:, 3::4] = raster.satz_fremd < 0
+
+        # Indexvektor je vorkommendem Muster nur einmal bestimmen
+        muster, muster_je_ma = np.unique(erlaubt, axis=0, return_inverse=True)
+        index_je_muster = [np.flatnonzero(relevant & zeile[schluessel]) for zeile in muster]
+
+        teile = [index_je_muster[m] for m in muster_je_ma.ravel()]
+        laengen = np.fromiter((len(t) for t in teile), dtype=np.intp, count=len(teile))
+        if laengen.sum() == 0:
+            continue
 
-    for _, row in provisionen.iterrows():
-        mitarbeiter = row.get("Mitarbeiter")
-        prov_eigen = float(row.get("Eigenleistung", 0) or 0)
-        prov_fremd = row.get("Fremdleistung")  # kann NaN sein
+        re_idx = np.concatenate(teile)
+        zeile = np.repeat(np.arange(len(teile)), laengen)
 
-        df = rechnungen.copy()
-        df["Provision"] = 0.0
+        # ausgewählte Sätze sind nie NaN (Muster) → ganzzahlig rechnen
+        k = kontext[re_idx]
+        satz_teile.append(np.where(
+            ist_fremd[re_idx], raster.satz_fremd[zeile, k], raster.satz_eigen[zeile, k]
+        ))
+        ma_teile.append(raster.mitarbeiter[zeile])
+        re_teile.append(re_idx)
 
-        # Eigenleistung: alle Rechnungen ohne Fremdleistung
-        mask_eigen = ~df["Ist_Fremdleistung"]
-        df.loc[mask_eigen, "Provision"] = (
-            df.loc[mask_eigen, "Netto"] * (prov_eigen / 100.0)
-        )
+    if not re_teile:
+        return pd.DataFrame(columns=ERGEBNIS_SPALTEN)
 
-        # Fremdleistung: nur wenn Satz vorhanden
-        if pd.notna(prov_fremd):
-            prov_fremd = float(prov_fremd or 0)
-            mask_fremd = df["Ist_Fremdleistung"]
-            df.loc[mask_fremd, "Provision"] = (
-                df.loc[mask_fremd, "Netto"] * (prov_fremd / 100.0)
-            )
-        else:
-            # keine Fremdleistungsprovision für diesen MA → Fremdleistungen raus
-            df = df[~df["Ist_Fremdleistung"]]
+    ma_idx = np.concatenate(ma_teile)
+    re_idx = np.concatenate(re_teile)
+    satz = np.concatenate(satz_teile)
+    if len(re_teile) > 1:
+        # Mitarbeiter wieder in Tabellenreihenfolge (Rechnungen je Mitarbeiter bleiben sortiert)
+        reihenfolge = np.argsort(ma_idx, kind="stable")
+        ma_idx, re_idx, satz = ma_idx[reihenfolge], re_idx[reihenfolge], satz[reihenfolge]
 
-        # nur Rechnungen mit Provision > 0 behalten
-        df = df[df["Provision"] > 0]
+    provision = provision_cent(netto[re_idx], satz.astype(np.int64))
 
-        if df.empty:
-            continue
+    # auf 0 Cent gerundete Provisionen fallen heraus
+    behalten = provision > 0
+    re_idx = re_idx[behalten]
+    ma_idx = ma_idx[behalten]
 
-        df["Mitarbeiter"] = mitarbeiter
-        alle.append(df)
-
-    if not alle:
-        return pd.DataFrame(
-            columns=[
-                "Mitarbeiter",
-                "Rechnungsnummer",
-                "Kunde",
-                "Projekt",
-                "Netto",
-                "Provision",
-                "Zahlungsdatum",
-                "Status",
-                "Ist_Fremdleistung",
-            ]
-        )
+    result = rechnungen.iloc[re_idx].reset_index(drop=True)
+    result["Netto_Cent"] = netto[re_idx]
+    result["Provision_Cent"] = provision[behalten]
+    result["Provision"] = cent_zu_euro(result["Provision_Cent"])
+    result["Mitarbeiter"] = mitarbeiter.take(ma_idx).reset_index(drop=True)
+
+    return result[ERGEBNIS_SPALTEN]
 
-    result = pd.concat(alle, ignore_index=True)
-
-    return result[
-        [
-            "Mitarbeiter",
-            "Rechnungsnummer",
-            "Kunde",
-            "Projekt",
-            "Netto",
-            "Provision",
-            "Zahlungsdatum",
-            "Status",
-            "Ist_Fremdleistung",
-        ]
-    ]
@@ -0,0 +1,114 @@
+"""
+Vektorisiertes Parsen von Beträgen und Datumswerten aus Rechnungsexporten.
+
+Jeder Wert wird nur einmal geparst: die Spalte wird über ``pd.factorize``
+auf ihre eindeutigen Werte reduziert (Zahlungsdaten und Beträge wiederholen
+sich stark), diese werden geparst und über die Codes zurückverteilt.
+Nicht lesbare Werte werden als Maske zurückgegeben statt still zu 0 bzw.
+NaT zu werden.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from utils.geld import euro_zu_cent, parse_cent
+
+# Explizite Datumsformate in Prüfreihenfolge (deutsch zuerst, dann ISO/Excel-Text)
+DATUMSFORMATE = [
+    "%d.%m.%Y",
+    "%Y-%m-%d",
+    "%d.%m.%y",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+]
+
+# Währungszeichen/-codes und Leerzeichen um Beträge; geschützte Leerzeichen
+# explizit (``\s`` der Arrow-Regex-Engine erfasst nur ASCII)
+_WAEHRUNG = r"€|EUR|Euro|\$|USD|CHF|£|\s" + "|\u00a0|\u202f"
+_ZAHL = r"\d+(?:\.\d*)?|\.\d+"
+
+
+def parse_betrag_cent(werte, dezimal=","):
+    """
+    Beträge wie ``1.234,56``, ``-1.234,56 €``, ``1.234,56-`` oder
+    ``(1.234,56)`` (Gutschriften) in Cent umwandeln.
+
+    ``dezimal``: ``","`` (Tausenderpunkt) oder ``"."`` (Tausenderkomma).
+    Zahlenspalten (z. B. aus Excel) werden direkt umgerechnet.
+
+    Gibt ``(cent, ungueltig)`` zurück: int64-Array (ungültig → 0) und
+    bool-Maske der leeren bzw. nicht lesbaren Werte.
+    """
+    werte = pd.Series(werte)
+    if pd.api.types.is_numeric_dtype(werte):
+        return euro_zu_cent(werte), werte.isna().to_numpy()
+
+    codes, eindeutig = pd.factorize(werte)
+    eindeutig = pd.Series(eindeutig, dtype=object)
+    # Zahlen in gemischten Spalten (Excel: Zahl- und Textzellen) direkt umrechnen
+    ist_zahl = eindeutig.map(_ist_zahl).to_numpy(dtype=bool)
+    text = eindeutig.where(~ist_zahl, "").astype(str)
+    zahl = text.str.replace(_WAEHRUNG, "", regex=True)
+
+    # Vorzeichen: führendes oder nachgestelltes Minus bzw. Klammern
+    klammern = zahl.str.match(r"^\(.*\)$")
+    negativ = klammern | zahl.str.startswith("-") | zahl.str.endswith("-")
+    zahl = zahl.where(~klammern, zahl.str[1:-1])
+    zahl = zahl.str.replace(r"^[+-]|-$", "", regex=True)
+
+    tausender = "." if dezimal == "," else ","
+    zahl = zahl.str.replace(tausender, "", regex=False).str.replace(dezimal, ".", regex=False)
+    gueltig = zahl.str.fullmatch(_ZAHL).to_numpy(dtype=bool)
+
+    cent = np.where(gueltig, parse_cent(zahl), 0)
+    cent = np.where(negativ.to_numpy(dtype=bool), -cent, cent)
+    if ist_zahl.any():
+        zahlen = pd.to_numeric(eindeutig.where(ist_zahl)).fillna(0)
+        cent = np.where(ist_zahl, euro_zu_cent(zahlen), cent)
+        gueltig = gueltig | ist_zahl
+
+    # Code -1 (leer/NaN) zeigt auf den angehängten Platzhalter: 0 Cent, ungültig
+    cent = np.append(cent, 0).astype(np.int64)
+    gueltig = np.append(gueltig, False)
+    return cent[codes], ~gueltig[codes]
+
+
+def _ist_zahl(wert):
+    return isinstance(wert, (int, float, np.number)) and not isinstance(wert, bool) and not pd.isna(wert)
+
+
+def parse_datum(werte, formate=DATUMSFORMATE):
+    """
+    Datumswerte mit expliziten Formaten parsen (``formate`` der Reihe nach,
+    ohne elementweises Raten). Datumsobjekte (Excel) bleiben erhalten.
+
+    Gibt ``(datum, ungueltig)`` zurück: ``datetime64``-Series (gleicher Index)
+    und bool-Maske der nicht leeren, aber nicht lesbaren Werte.
+    """
+    werte = pd.Series(werte)
+    if pd.api.types.is_datetime64_any_dtype(werte):
+        return werte, np.zeros(len(werte), dtype=bool)
+
+    codes, eindeutig = pd.factorize(werte)
+    eindeutig = pd.Series(eindeutig, dtype=object)
+    ist_datum = eindeutig.map(lambda w: isinstance(w, date)).to_numpy(dtype=bool)
+
+    datum = pd.to_datetime(eindeutig.where(ist_datum), errors="coerce")
+    text = eindeutig.where(~ist_datum, "").astype(str).str.strip()
+    offen = (text != "") & datum.isna()
+    for format in formate:
+        if not offen.any():
+            break
+        geparst = pd.to_datetime(text.where(offen), format=format, errors="coerce")
+        datum = datum.fillna(geparst)
+        offen &= geparst.isna()
+    # einheitliche Auflösung (formatabhängig sonst teils Sekunden)
+    datum = datum.astype("datetime64[us]")
+
+    # leere Werte (Code -1) sind NaT, aber kein Fehler
+    ungueltig = np.append(offen.to_numpy(dtype=bool), False)
+    return (
+        pd.Series(datum.array.take(codes, allow_fill=True), index=werte.index),
+        ungueltig[codes],
+    )
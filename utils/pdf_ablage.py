@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+class PdfAblage:
+    """
+    Inhaltsadressierte Ablage erzeugter Mitarbeiter-PDFs auf der Festplatte.
+
+    Schlüssel ist der Hash der Eingangsdaten eines Mitarbeiters (Zeilen,
+    Sätze, Layout-Version; ``utils.pdf_generator.zeilen_hashes``). Die PDFs
+    werden deterministisch erzeugt, gleiche Eingaben ergeben also dieselben
+    Bytes. Ein erneuter Export übernimmt vorhandene PDFs, statt sie neu zu
+    rendern.
+
+    Je Kontext (z. B. Ausgabeverzeichnis eines Batch-Laufs) wird der letzte
+    Stand ``Mitarbeiter → Schlüssel`` gemerkt; daraus ergibt sich im Manifest,
+    welche Abrechnungen sich seit dem letzten Export geändert haben.
+
+    Aufbau: ``<pfad>/pdf/<ab>/<schluessel>.pdf`` und ``<pfad>/stand/<kontext>.json``.
+    """
+
+    def __init__(self, pfad):
+        self.pfad = Path(pfad)
+
+    def _datei(self, schluessel):
+        return self.pfad / "pdf" / schluessel[:2] / f"{schluessel}.pdf"
+
+    def _stand_datei(self, kontext):
+        name = "".join(z if z.isalnum() or z in "-_." else "_" for z in str(kontext))
+        return self.pfad / "stand" / f"{name or 'standard'}.json"
+
+    def __contains__(self, schluessel):
+        return self._datei(schluessel).exists()
+
+    def lesen(self, schluessel):
+        """PDF-Bytes zum Schlüssel oder ``None``."""
+        try:
+            return self._datei(schluessel).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def speichern(self, schluessel, pdf_bytes):
+        """PDF ablegen (atomar; vorhandene Schlüssel bleiben unverändert)."""
+        datei = self._datei(schluessel)
+        if not datei.exists():
+            _schreibe_atomar(datei, pdf_bytes)
+
+    def stand(self, kontext="standard"):
+        """Letzter Stand ``{Mitarbeiter: Schlüssel}`` eines Kontexts (leer, wenn unbekannt)."""
+        try:
+            return json.loads(self._stand_datei(kontext).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def stand_speichern(self, stand, kontext="standard"):
+        daten = json.dumps(stand, ensure_ascii=False, indent=1, sort_keys=True)
+        _schreibe_atomar(self._stand_datei(kontext), daten.encode("utf-8"))
+
+
+def _schreibe_atomar(datei, daten):
+    # erst temporär schreiben, dann umbenennen: parallele Läufe sehen nie halbe Dateien
+    datei.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=datei.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(daten)
+        os.replace(tmp, datei)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -1,17 +1,47 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from io import BytesIO
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfgen import canvas
+from tempfile import SpooledTemporaryFile
+from zipfile import ZipFile, ZipInfo
+import numpy as np
 import pandas as pd
-
-def _format_eur(value: float) -> str:
-    """Zahl als € mit deutschem Dezimalformat."""
-    try:
-        value = float(value)
-    except (TypeError, ValueError):
-        return ""
-    s = f"{value:,.2f}"
-    s = s.replace(",", "X").replace(".", ",").replace("X", ".")
-    return s + " €"
+from utils.cache import LRUCache
+from utils.geld import euro_zu_cent, format_cent
+from utils.instrumentation import messe
+
+logger = logging.getLogger("provisionstool.pdf")
+
+# Worker-Prozesse nicht per fork starten: die App exportiert aus einem
+# Hintergrund-Thread, geforkte Kinder könnten gehaltene Sperren erben
+_MP_KONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Spalten, aus denen das PDF eines Mitarbeiters erzeugt wird
+PDF_SPALTEN = [
+    "Mitarbeiter",
+    "Rechnungsnummer",
+    "Kunde",
+    "Projekt",
+    "Netto",
+    "Provision",
+    "Zahlungsdatum",
+    "Status",
+    "Ist_Fremdleistung",
+]
+
+# Bei Layout-Änderungen erhöhen: macht abgelegte PDFs (``PdfAblage``) ungültig
+PDF_LAYOUT_VERSION = 1
+
+# Zuletzt erzeugte Mitarbeiter-PDFs (Vorschau und ZIP-Export), prozessweit;
+# Schlüssel ist der Hash der Zeilen des Mitarbeiters (``zeilen_hashes``)
+_PDF_CACHE = LRUCache(max_eintraege=1024, max_bytes=128 * 1024 * 1024)
+_PDF_CACHE_SPERRE = threading.Lock()
 
 def _format_date(dt) -> str:
     """Datum im Format TT.MM.JJJJ."""
@@ -22,16 +52,129 @@ def _format_date(dt) -> str:
     except Exception:
         return str(dt)
 
+# Vorformatierte Anzeigespalten in Tabellenreihenfolge
+# [Re-Nr., Kunde, Projekt, Datum, Art, Netto, Prämie]
+ANZEIGE_SPALTEN = ["_re_nr", "_kunde", "_projekt", "_datum", "_art", "_netto_text", "_praemie_text"]
+
+def formatiere_tabelle(df) -> pd.DataFrame:
+    """
+    Anzeigetexte aller Tabellenzellen einmalig für das ganze DataFrame berechnen
+    (gleicher Index wie ``df``). Zusätzlich ``_netto`` / ``_praemie`` in Cent
+    (int64) für exakte Summenzeilen; sind ``Netto_Cent`` / ``Provision_Cent``
+    vorhanden, werden sie direkt verwendet.
+    """
+    netto = _cent_spalte(df, "Netto")
+    praemie = _cent_spalte(df, "Provision")
+
+    return pd.DataFrame(
+        {
+            "_re_nr": df["Rechnungsnummer"].map(str),
+            "_kunde": df["Kunde"].map(str).str[:35],
+            "_projekt": df["Projekt"].map(str).str[:35],
+            "_datum": _format_date_spalte(df["Zahlungsdatum"]),
+            "_art": np.where(_als_bool(df["Ist_Fremdleistung"]), "Fremd", "Eigen"),
+            "_netto_text": _format_cent_eindeutig(netto),
+            "_praemie_text": _format_cent_eindeutig(praemie),
+            "_netto": netto,
+            "_praemie": praemie,
+        },
+        index=df.index,
+    )
+
+def _cent_spalte(df, spalte) -> np.ndarray:
+    """Betrag in Cent: ``<spalte>_Cent`` falls vorhanden, sonst aus float-Euro."""
+    if f"{spalte}_Cent" in df.columns:
+        return df[f"{spalte}_Cent"].to_numpy(dtype=np.int64)
+    return euro_zu_cent(_als_float(df[spalte]))
+
+def _als_float(spalte) -> np.ndarray:
+    """Wie ``float(wert or 0.0)`` je Zelle."""
+    if pd.api.types.is_float_dtype(spalte) or pd.api.types.is_integer_dtype(spalte):
+        return spalte.to_numpy(dtype=float)
+    return np.array([float(v or 0.0) for v in spalte], dtype=float)
+
+def _als_bool(spalte) -> np.ndarray:
+    if pd.api.types.is_bool_dtype(spalte):
+        return spalte.to_numpy(dtype=bool)
+    return np.array([bool(v) for v in spalte], dtype=bool)
+
+def _format_cent_eindeutig(werte: np.ndarray) -> np.ndarray:
+    """``format_cent`` je eindeutigem Wert (Beträge wiederholen sich je Mitarbeiter)."""
+    if len(werte) == 0:
+        return np.array([], dtype=object)
+    eindeutig, rueck = np.unique(werte, return_inverse=True)
+    texte = np.array([format_cent(v) for v in eindeutig], dtype=object)
+    return texte[rueck]
+
+def _format_date_spalte(spalte) -> np.ndarray:
+    """``_format_date`` für eine ganze Spalte."""
+    if pd.api.types.is_datetime64_any_dtype(spalte):
+        return spalte.dt.strftime("%d.%m.%Y").fillna("").to_numpy(dtype=object)
+    return np.array([_format_date(v) for v in spalte], dtype=object)
+
+@lru_cache(maxsize=None)
+def _pdf_vorlage():
+    """
+    reportlab erst beim ersten PDF importieren; Seitengröße und
+    Schriftmetriken (Helvetica, Helvetica-Bold) einmal je Prozess laden.
+    Gibt ``(Canvas-Klasse, (breite, hoehe))`` zurück.
+    """
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfgen import canvas
+
+    for schrift in ("Helvetica", "Helvetica-Bold"):
+        pdfmetrics.getFont(schrift)
+    return canvas.Canvas, landscape(A4)
+
+# Tabellenlayout (Querformat → mehr Breite nutzen), für alle Mitarbeiter gleich
+# [Re-Nr., Kunde, Projekt, Datum, Art, Netto, Prämie]
+KOPF_SPALTEN_X = [
+    40,    # Rechnungsnummer
+    120,   # Kunde
+    280,   # Projekt
+    480,   # Datum
+    540,   # Art
+    600,   # Netto
+    700,   # Prämie
+]
+KOPF_UEBERSCHRIFTEN = ["Re-Nr.", "Kunde", "Projekt", "Datum", "Art", "Netto", "Prämie"]
+
+def _kopf_form(c, width, height, mit_titel: bool) -> str:
+    """
+    Statische Kopfteile (Überschrift, Spaltenköpfe, Linie) einmal je Dokument
+    als Form-XObject anlegen; jede Seite referenziert sie nur noch.
+    """
+    name = "kopf_mit_titel" if mit_titel else "kopf"
+    if c.hasForm(name):
+        return name
+
+    c.beginForm(name)
+    y = height - 40
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(40, y, "Prämienabrechnung")
+    y -= 45
+    if mit_titel:
+        y -= 20
+
+    c.setFont("Helvetica-Bold", 9)
+    for x, h in zip(KOPF_SPALTEN_X, KOPF_UEBERSCHRIFTEN):
+        c.drawString(x, y, h)
+    c.line(40, y - 5, width - 40, y - 5)
+    c.endForm()
+    return name
+
 def _draw_header(c, width, height, mitarbeiter: str, title_suffix: str = ""):
     """
     Seitenkopf + Tabellenkopf zeichnen.
     title_suffix: "" / "A) ..." / "B) ..."
+    Nur Mitarbeiter und Abschnittstitel werden je Seite gezeichnet,
+    der Rest kommt aus dem Form-XObject (``_kopf_form``).
     Gibt neue y-Position und Spalten-X zurück.
     """
-    y = height - 40
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, y, "Prämienabrechnung")
-    y -= 20
+    c.doForm(_kopf_form(c, width, height, bool(title_suffix)))
+
+    y = height - 60
     c.setFont("Helvetica", 12)
     c.drawString(40, y, f"Mitarbeiter: {mitarbeiter}")
     y -= 25
@@ -41,31 +184,17 @@ def _draw_header(c, width, height, mitarbeiter: str, title_suffix: str = ""):
         c.drawString(40, y, title_suffix)
         y -= 20
 
-    # Tabellenkopf
-    c.setFont("Helvetica-Bold", 9)
+    # Tabellenkopf + Linie (im Form-XObject)
+    return _tabellen_start_y(height, bool(title_suffix)), KOPF_SPALTEN_X
 
-    # Querformat → mehr Breite nutzen
-    # [Re-Nr., Kunde, Projekt, Datum, Art, Netto, Prämie]
-    col_x = [
-        40,    # Rechnungsnummer
-        120,   # Kunde
-        280,   # Projekt
-        480,   # Datum
-        540,   # Art
-        600,   # Netto
-        700,   # Prämie
-    ]
-    headers = ["Re-Nr.", "Kunde", "Projekt", "Datum", "Art", "Netto", "Prämie"]
-
-    for x, h in zip(col_x, headers):
-        c.drawString(x, y, h)
+def _tabellen_start_y(height, mit_titel: bool) -> float:
+    """y-Position der ersten Tabellenzeile unter dem Seitenkopf."""
+    return height - 125 if mit_titel else height - 105
 
-    y -= 5
-    c.line(40, y, width - 40, y)
-    y -= 15
-    return y, col_x
-
-def exportiere_pdfs_in_memory(df):
+def exportiere_pdfs_in_memory(
+    df, parallel=False, max_workers=None, chunksize=1, fehler=None, fortschritt=None,
+    **optionen,
+):
     """
     Erwartet ein DataFrame mit mindestens:
       - Mitarbeiter
@@ -80,180 +209,408 @@ def exportiere_pdfs_in_memory(df):
 
     Block A: Bezahlte Rechnungen (Auszahlungsbasis)
     Block B: Offene Rechnungen (Prämienvorschau, nicht in Auszahlungssumme)
-    """
-    dateien = []
 
+    parallel: Mitarbeiter-PDFs in einem Prozesspool rendern
+      (``max_workers`` Prozesse, ``chunksize`` Mitarbeiter je Auftrag).
+      Reihenfolge und Ergebnis sind identisch zum seriellen Modus.
+    fehler: optionale Liste, an die je fehlgeschlagenem Mitarbeiter
+      ``(mitarbeiter, fehlermeldung)`` angehängt wird.
+    fortschritt: optionale Funktion ``(fertig, gesamt, mitarbeiter)``, die nach
+      jedem Mitarbeiter (auch bei Fehlern) aufgerufen wird.
+    optionen: ``deterministisch``, ``ablage``, ``provisionen``, ``manifest``,
+      ``kontext`` (siehe ``exportiere_pdfs_einzeln``).
+    """
+    return list(
+        exportiere_pdfs_einzeln(
+            df, parallel=parallel, max_workers=max_workers, chunksize=chunksize,
+            fehler=fehler, fortschritt=fortschritt, **optionen,
+        )
+    )
+
+def exportiere_pdfs_einzeln(
+    df, parallel=False, max_workers=None, chunksize=1, fehler=None, fortschritt=None,
+    deterministisch=False, ablage=None, provisionen=None, manifest=None, kontext="standard",
+):
+    """
+    Generator-Variante von ``exportiere_pdfs_in_memory``: liefert
+    ``(dateiname, BytesIO)`` je Mitarbeiter, sobald das PDF fertig ist.
+    Im seriellen Modus liegt so immer nur ein PDF gleichzeitig im Speicher.
+
+    deterministisch: PDFs ohne Zeitstempel/Zufalls-ID (gleiche Daten → gleiche Bytes)
+    ablage: optionale ``PdfAblage``; unveränderte Mitarbeiter werden von dort
+      übernommen statt neu gerendert (erzwingt ``deterministisch``)
+    provisionen: Provisionstabelle; die Sätze eines Mitarbeiters gehen mit in
+      seinen Schlüssel ein
+    manifest: optionale Liste, an die je Mitarbeiter ein Eintrag mit Status
+      (neu/geaendert/unveraendert/fehler, zuletzt entfallene Mitarbeiter)
+      gegenüber dem letzten Export im ``kontext`` der Ablage angehängt wird
+    """
     if df is None or df.empty:
-        return dateien
-
-    required_cols = [
-        "Mitarbeiter",
-        "Rechnungsnummer",
-        "Kunde",
-        "Projekt",
-        "Netto",
-        "Provision",
-        "Zahlungsdatum",
-        "Status",
-        "Ist_Fremdleistung",
-    ]
-    for col in required_cols:
+        return
+    _pruefe_spalten(df)
+    if ablage is not None:
+        deterministisch = True
+
+    # Anzeigetexte einmal für alle Mitarbeiter vorberechnen
+    hashes = zeilen_hashes(df, provisionen=provisionen, deterministisch=deterministisch)
+    df = pd.concat([df, formatiere_tabelle(df)], axis=1)
+    gruppen = df.groupby("Mitarbeiter", observed=True)
+    gesamt = gruppen.ngroups
+    rendern = partial(_render_auftrag, deterministisch=deterministisch)
+    wiederverwendet = set()
+
+    if parallel and gesamt > 1:
+        # nur PDFs rendern, die nicht schon im Cache liegen (Reihenfolge bleibt)
+        gecacht, reihenfolge, offen = {}, [], []
+        for mitarbeiter, gruppe in gruppen:
+            reihenfolge.append(mitarbeiter)
+            pdf_bytes = _vorhandenes_pdf(hashes[mitarbeiter], ablage)
+            if pdf_bytes is None:
+                offen.append((mitarbeiter, gruppe))
+            else:
+                gecacht[mitarbeiter] = pdf_bytes
+        wiederverwendet.update(gecacht)
+
+        with messe("pdf_render", modus="parallel") as m, \
+                ProcessPoolExecutor(max_workers=max_workers, mp_context=_MP_KONTEXT) as pool:
+            m["zeilen"] = sum(len(gruppe) for _, gruppe in offen)
+            m["aus_cache"] = len(gecacht)
+            gerendert = _mit_ablage(
+                pool.map(rendern, offen, chunksize=chunksize), hashes, ablage
+            )
+            ergebnisse = (
+                (mitarbeiter, gecacht.pop(mitarbeiter), None) if mitarbeiter in gecacht
+                else next(gerendert)
+                for mitarbeiter in reihenfolge
+            )
+            yield from _sammle_ergebnisse(
+                _protokolliere(ergebnisse, hashes, ablage, manifest, kontext, wiederverwendet),
+                fehler, fortschritt, gesamt,
+            )
+    else:
+        ergebnisse = _mit_ablage(
+            (
+                _aus_cache_oder_rendern(t, hashes[t[0]], rendern, ablage, wiederverwendet)
+                for t in gruppen
+            ),
+            hashes, ablage,
+        )
+        yield from _sammle_ergebnisse(
+            _protokolliere(ergebnisse, hashes, ablage, manifest, kontext, wiederverwendet),
+            fehler, fortschritt, gesamt,
+        )
+
+def mitarbeiter_pdf(df, mitarbeiter) -> bytes:
+    """
+    PDF eines einzelnen Mitarbeiters (z. B. für die Vorschau). Sind seine
+    Zeilen unverändert, kommt es aus dem Cache; neu erzeugte PDFs werden dort
+    abgelegt und vom ZIP-Export wiederverwendet.
+    """
+    _pruefe_spalten(df)
+    gruppe = df[df["Mitarbeiter"] == mitarbeiter]
+    if gruppe.empty:
+        raise ValueError(f"Keine Zeilen für Mitarbeiter '{mitarbeiter}'.")
+
+    schluessel = zeilen_hashes(gruppe)[mitarbeiter]
+    pdf_bytes = _pdf_cache_get(schluessel)
+    if pdf_bytes is None:
+        with messe("pdf_render", mitarbeiter=str(mitarbeiter)) as m:
+            pdf_bytes = render_mitarbeiter_pdf(mitarbeiter, gruppe)
+            m["zeilen"] = len(gruppe)
+        _pdf_cache_put(schluessel, pdf_bytes)
+    return pdf_bytes
+
+def zeilen_hashes(df, provisionen=None, deterministisch=False) -> dict:
+    """
+    Schlüssel je Mitarbeiter: Hash der PDF-relevanten Zeilen (inkl.
+    Reihenfolge), optional seiner Zeilen in ``provisionen``, sowie von
+    ``PDF_LAYOUT_VERSION`` und ``deterministisch``. Gleiche Zeilen ergeben
+    unabhängig vom restlichen DataFrame denselben Schlüssel.
+    """
+    spalten = PDF_SPALTEN + [s for s in ("Netto_Cent", "Provision_Cent") if s in df.columns]
+    zeilen = pd.util.hash_pandas_object(df[spalten], index=False).to_numpy()
+
+    saetze, satz_positionen = None, {}
+    if provisionen is not None and "Mitarbeiter" in provisionen.columns:
+        saetze = pd.util.hash_pandas_object(provisionen, index=False).to_numpy()
+        satz_positionen = {
+            str(name): positionen
+            for name, positionen in provisionen.groupby("Mitarbeiter", sort=False).indices.items()
+        }
+
+    praefix = f"v{PDF_LAYOUT_VERSION}|{int(deterministisch)}|".encode()
+    hashes = {}
+    for mitarbeiter, positionen in df.groupby("Mitarbeiter", observed=True).indices.items():
+        h = hashlib.blake2b(praefix, digest_size=16)
+        h.update(zeilen[positionen].tobytes())
+        if saetze is not None:
+            h.update(b"|saetze|")
+            h.update(saetze[satz_positionen.get(str(mitarbeiter), [])].tobytes())
+        hashes[mitarbeiter] = h.hexdigest()
+    return hashes
+
+def _pruefe_spalten(df):
+    for col in PDF_SPALTEN:
         if col not in df.columns:
             raise ValueError(f"Spalte '{col}' fehlt im DataFrame für die PDF-Erstellung.")
 
-    for mitarbeiter, gruppe in df.groupby("Mitarbeiter"):
-        try:
-            buffer = BytesIO()
-            # Querformat A4
-            c = canvas.Canvas(buffer, pagesize=landscape(A4))
-            width, height = landscape(A4)
-
-            # nach Datum, dann Rechnungsnummer sortieren
-            gruppe = gruppe.sort_values(by=["Zahlungsdatum", "Rechnungsnummer"])
-
-            # in bezahlt / offen splitten
-            status = gruppe["Status"].astype(str)
-            paid = gruppe[status == "Bezahlt"].copy()
-            open_ = gruppe[status != "Bezahlt"].copy()
-
-            # -------------------------
-            # Block A: bezahlte Rechnungen
-            # -------------------------
-            y, col_x = _draw_header(
-                c, width, height, mitarbeiter,
-                "A) Bezahlte Rechnungen – Prämienbasis"
+def _pdf_cache_get(schluessel):
+    with _PDF_CACHE_SPERRE:
+        return _PDF_CACHE.get(schluessel)
+
+def _pdf_cache_put(schluessel, pdf_bytes):
+    with _PDF_CACHE_SPERRE:
+        _PDF_CACHE.put(schluessel, pdf_bytes, len(pdf_bytes))
+
+def _vorhandenes_pdf(schluessel, ablage):
+    """Bereits erzeugtes PDF aus dem Speicher-Cache oder der Ablage (sonst ``None``)."""
+    pdf_bytes = _pdf_cache_get(schluessel)
+    if pdf_bytes is None and ablage is not None:
+        pdf_bytes = ablage.lesen(schluessel)
+        if pdf_bytes is not None:
+            _pdf_cache_put(schluessel, pdf_bytes)
+    return pdf_bytes
+
+def _aus_cache_oder_rendern(gruppe_tupel, schluessel, rendern, ablage, wiederverwendet):
+    pdf_bytes = _vorhandenes_pdf(schluessel, ablage)
+    if pdf_bytes is not None:
+        wiederverwendet.add(gruppe_tupel[0])
+        return gruppe_tupel[0], pdf_bytes, None
+    return rendern(gruppe_tupel)
+
+def _mit_ablage(ergebnisse, hashes, ablage):
+    """Erfolgreich erzeugte PDFs im Cache (und in der Ablage) speichern und weitergeben."""
+    for mitarbeiter, pdf_bytes, fehlermeldung in ergebnisse:
+        if pdf_bytes is not None:
+            _pdf_cache_put(hashes[mitarbeiter], pdf_bytes)
+            if ablage is not None:
+                ablage.speichern(hashes[mitarbeiter], pdf_bytes)
+        yield mitarbeiter, pdf_bytes, fehlermeldung
+
+def _protokolliere(ergebnisse, hashes, ablage, manifest, kontext, wiederverwendet):
+    """
+    Manifest-Einträge je Mitarbeiter anhängen und nach vollständigem Durchlauf
+    den Stand des Kontexts in der Ablage aktualisieren.
+    """
+    if manifest is None and ablage is None:
+        yield from ergebnisse
+        return
+
+    vorher = ablage.stand(kontext) if ablage is not None else {}
+    stand = {}
+    for mitarbeiter, pdf_bytes, fehlermeldung in ergebnisse:
+        name, schluessel = str(mitarbeiter), hashes[mitarbeiter]
+        alt = vorher.pop(name, None)
+        if fehlermeldung is not None:
+            status = "fehler"
+            if alt is not None:
+                stand[name] = alt
+        else:
+            status = "neu" if alt is None else "unveraendert" if alt == schluessel else "geaendert"
+            stand[name] = schluessel
+        if manifest is not None:
+            manifest.append({
+                "mitarbeiter": name,
+                "datei": pdf_dateiname(mitarbeiter),
+                "status": status,
+                "schluessel": schluessel,
+                "sha256": hashlib.sha256(pdf_bytes).hexdigest() if pdf_bytes is not None else None,
+                "neu_erzeugt": pdf_bytes is not None and mitarbeiter not in wiederverwendet,
+            })
+        yield mitarbeiter, pdf_bytes, fehlermeldung
+
+    if manifest is not None:
+        for name in sorted(vorher):
+            manifest.append({
+                "mitarbeiter": name, "datei": None, "status": "entfallen",
+                "schluessel": None, "sha256": None, "neu_erzeugt": False,
+            })
+    if ablage is not None:
+        ablage.stand_speichern(stand, kontext)
+
+def exportiere_zip(df, max_speicher_bytes=64 * 1024 * 1024, ziel=None, **optionen):
+    """
+    Alle Mitarbeiter-PDFs direkt in ein ZIP schreiben, ohne sie vorher zu sammeln.
+
+    Das ZIP liegt bis ``max_speicher_bytes`` im Speicher und wird darüber
+    automatisch in eine temporäre Datei ausgelagert. Mit ``ziel`` (binär
+    geöffnete Datei) wird direkt dorthin geschrieben.
+    ``optionen`` werden an ``exportiere_pdfs_einzeln`` weitergegeben.
+
+    Mit ``ablage`` enthält das ZIP zusätzlich ``manifest.json`` (geänderte,
+    unveränderte, neue und entfallene Abrechnungen); deterministische ZIPs
+    erhalten feste Zeitstempel.
+
+    Gibt ``(zip_datei, inhalt)`` zurück: die auf Position 0 gesetzte Datei
+    und eine Liste ``(dateiname, groesse_in_bytes)`` der enthaltenen PDFs.
+    """
+    deterministisch = optionen.get("deterministisch") or optionen.get("ablage") is not None
+    if optionen.get("ablage") is not None and optionen.get("manifest") is None:
+        optionen["manifest"] = []
+
+    def eintrag(dateiname):
+        return ZipInfo(dateiname, date_time=(1980, 1, 1, 0, 0, 0)) if deterministisch else dateiname
+
+    zip_datei = ziel if ziel is not None else SpooledTemporaryFile(max_size=max_speicher_bytes)
+    inhalt = []
+    with messe("zip_erstellung") as m, ZipFile(zip_datei, "w") as zipf:
+        for dateiname, pdf_buffer in exportiere_pdfs_einzeln(df, **optionen):
+            daten = pdf_buffer.getvalue()
+            zipf.writestr(eintrag(dateiname), daten)
+            inhalt.append((dateiname, len(daten)))
+        if optionen.get("ablage") is not None:
+            zipf.writestr(
+                eintrag("manifest.json"),
+                json.dumps(optionen["manifest"], ensure_ascii=False, indent=1),
             )
-            c.setFont("Helvetica", 9)
-
-            total_netto_paid = 0.0
-            total_praemie_paid = 0.0
-
-            for _, row in paid.iterrows():
-                if y < 60:
-                    c.showPage()
-                    y, col_x = _draw_header(
-                        c, width, height, mitarbeiter,
-                        "A) Bezahlte Rechnungen – Prämienbasis"
-                    )
-                    c.setFont("Helvetica", 9)
-
-                re_nr = str(row.get("Rechnungsnummer", ""))
-                kunde = str(row.get("Kunde", ""))[:35]
-                projekt = str(row.get("Projekt", ""))[:35]
-                datum = _format_date(row.get("Zahlungsdatum"))
-                art = "Fremd" if bool(row.get("Ist_Fremdleistung")) else "Eigen"
-                netto = float(row.get("Netto", 0.0) or 0.0)
-                praemie = float(row.get("Provision", 0.0) or 0.0)
-
-                total_netto_paid += netto
-                total_praemie_paid += praemie
-
-                values = [
-                    re_nr,
-                    kunde,
-                    projekt,
-                    datum,
-                    art,
-                    _format_eur(netto),
-                    _format_eur(praemie),
-                ]
-
-                for x, v in zip(col_x, values):
-                    c.drawString(x, y, str(v))
-
-                y -= 15
-
-            # Summenzeile für bezahlte Rechnungen
-            if y < 80:
-                c.showPage()
-                y, col_x = _draw_header(
-                    c, width, height, mitarbeiter,
-                    "A) Bezahlte Rechnungen – Prämienbasis"
-                )
-                c.setFont("Helvetica", 9)
-                y -= 10
-
-            y -= 5
-            c.line(40, y, width - 40, y)
-            y -= 15
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(40, y, "Summe auszuzahlende Prämie:")
-            c.drawString(col_x[5], y, _format_eur(total_netto_paid))
-            c.drawString(col_x[6], y, _format_eur(total_praemie_paid))
-
-            # -------------------------
-            # Block B: offene Rechnungen (Prämienvorschau)
-            # -------------------------
-            if not open_.empty:
-                c.showPage()
-                y, col_x = _draw_header(
-                    c, width, height, mitarbeiter,
-                    "B) Offene Rechnungen – Prämienvorschau (nicht auszahlungsrelevant)"
-                )
-                c.setFont("Helvetica", 9)
-
-                total_netto_open = 0.0
-                total_praemie_open = 0.0
-
-                for _, row in open_.iterrows():
-                    if y < 60:
-                        c.showPage()
-                        y, col_x = _draw_header(
-                            c, width, height, mitarbeiter,
-                            "B) Offene Rechnungen – Prämienvorschau (nicht auszahlungsrelevant)"
-                        )
-                        c.setFont("Helvetica", 9)
-
-                    re_nr = str(row.get("Rechnungsnummer", ""))
-                    kunde = str(row.get("Kunde", ""))[:35]
-                    projekt = str(row.get("Projekt", ""))[:35]
-                    datum = _format_date(row.get("Zahlungsdatum"))
-                    art = "Fremd" if bool(row.get("Ist_Fremdleistung")) else "Eigen"
-                    netto = float(row.get("Netto", 0.0) or 0.0)
-                    praemie = float(row.get("Provision", 0.0) or 0.0)
-
-                    total_netto_open += netto
-                    total_praemie_open += praemie
-
-                    values = [
-                        re_nr,
-                        kunde,
-                        projekt,
-                        datum,
-                        art,
-                        _format_eur(netto),
-                        _format_eur(praemie),
-                    ]
-
-                    for x, v in zip(col_x, values):
-                        c.drawString(x, y, str(v))
-
-                    y -= 15
-
-                # Summenzeile Vorschau
-                if y < 80:
-                    c.showPage()
-                    y, col_x = _draw_header(
-                        c, width, height, mitarbeiter,
-                        "B) Offene Rechnungen – Prämienvorschau (nicht auszahlungsrelevant)"
-                    )
-                    c.setFont("Helvetica", 9)
-                    y -= 10
-
-                y -= 5
-                c.line(40, y, width - 40, y)
-                y -= 15
-                c.setFont("Helvetica-Bold", 10)
-                c.drawString(40, y, "Summe Prämienvorschau (offene Rechnungen):")
-                c.drawString(col_x[5], y, _format_eur(total_netto_open))
-                c.drawString(col_x[6], y, _format_eur(total_praemie_open))
-
-            c.save()
-            buffer.seek(0)
-            dateiname = f"praemie_{str(mitarbeiter).replace(' ', '_')}.pdf"
-            dateien.append((dateiname, buffer))
-
-        except Exception as e:
-            print(f"❌ Fehler bei PDF für {mitarbeiter}: {e}")
-
-    return dateien
+        m["zeilen"] = len(inhalt)
+    zip_datei.seek(0)
+    return zip_datei, inhalt
+
+def _sammle_ergebnisse(ergebnisse, fehler, fortschritt=None, gesamt=None):
+    for fertig, (mitarbeiter, pdf_bytes, fehlermeldung) in enumerate(ergebnisse, start=1):
+        if fortschritt is not None:
+            fortschritt(fertig, gesamt, mitarbeiter)
+        if fehlermeldung is not None:
+            logger.warning("Fehler bei PDF für %s: %s", mitarbeiter, fehlermeldung)
+            if fehler is not None:
+                fehler.append((mitarbeiter, fehlermeldung))
+            continue
+        yield pdf_dateiname(mitarbeiter), BytesIO(pdf_bytes)
+
+def pdf_dateiname(mitarbeiter) -> str:
+    """Dateiname des Mitarbeiter-PDFs (im ZIP und beim Einzeldownload)."""
+    return f"praemie_{str(mitarbeiter).replace(' ', '_')}.pdf"
+
+def _render_auftrag(gruppe_tupel, deterministisch=False):
+    """
+    Ein Mitarbeiter-PDF rendern (auch im Worker-Prozess aufrufbar).
+    Gibt ``(mitarbeiter, pdf_bytes, None)`` bzw. ``(mitarbeiter, None, fehler)`` zurück.
+    """
+    mitarbeiter, gruppe = gruppe_tupel
+    try:
+        # im Worker-Prozess ist kein Messprotokoll aktiv → keine Messung
+        with messe("pdf_render", mitarbeiter=str(mitarbeiter)) as m:
+            pdf_bytes = render_mitarbeiter_pdf(mitarbeiter, gruppe, deterministisch)
+            m["zeilen"] = len(gruppe)
+        return mitarbeiter, pdf_bytes, None
+    except Exception as e:
+        return mitarbeiter, None, str(e)
+
+def render_mitarbeiter_pdf(mitarbeiter, gruppe, deterministisch=False) -> bytes:
+    """
+    PDF-Abrechnung eines Mitarbeiters (Block A + B) als Bytes.
+    deterministisch: reportlab-``invariant`` (fester Zeitstempel und feste
+    Dokument-ID), gleiche Zeilen ergeben byte-identische PDFs.
+    """
+    if ANZEIGE_SPALTEN[0] not in gruppe.columns:
+        gruppe = pd.concat([gruppe, formatiere_tabelle(gruppe)], axis=1)
+
+    buffer = BytesIO()
+    # Querformat A4
+    canvas_klasse, seitengroesse = _pdf_vorlage()
+    c = canvas_klasse(buffer, pagesize=seitengroesse, invariant=int(deterministisch))
+    width, height = seitengroesse
+
+    # nach Datum, dann Rechnungsnummer sortieren
+    gruppe = gruppe.sort_values(by=["Zahlungsdatum", "Rechnungsnummer"])
+
+    # in bezahlt / offen splitten
+    status = gruppe["Status"].astype(str)
+    paid = gruppe[status == "Bezahlt"]
+    open_ = gruppe[status != "Bezahlt"]
+
+    # -------------------------
+    # Block A: bezahlte Rechnungen
+    # -------------------------
+    _draw_block(
+        c, width, height, mitarbeiter, paid,
+        "A) Bezahlte Rechnungen – Prämienbasis",
+        "Summe auszuzahlende Prämie:",
+    )
+
+    # -------------------------
+    # Block B: offene Rechnungen (Prämienvorschau)
+    # -------------------------
+    if not open_.empty:
+        c.showPage()
+        _draw_block(
+            c, width, height, mitarbeiter, open_,
+            "B) Offene Rechnungen – Prämienvorschau (nicht auszahlungsrelevant)",
+            "Summe Prämienvorschau (offene Rechnungen):",
+        )
+
+    c.save()
+    return buffer.getvalue()
+
+# Tabellenzeilen: Zeilenabstand und Seitenränder für Umbruch / Summenzeile
+ZEILENABSTAND = 15
+MIN_Y_ZEILE = 60
+MIN_Y_SUMME = 80
+
+def _seitenaufteilung(anzahl_zeilen: int, y_start: float):
+    """
+    Seitenlayout eines Blocks vorab bestimmen.
+    Gibt ``(seiten, summe_neue_seite)`` zurück: ``seiten`` ist eine Liste
+    ``(start, ende)`` der Zeilenbereiche je Seite (mindestens eine Seite),
+    ``summe_neue_seite`` ob die Summenzeile auf eine eigene Seite muss.
+    """
+    zeilen_pro_seite = max(int((y_start - MIN_Y_ZEILE) // ZEILENABSTAND) + 1, 1)
+    starts = range(0, max(anzahl_zeilen, 1), zeilen_pro_seite)
+    seiten = [(start, min(start + zeilen_pro_seite, anzahl_zeilen)) for start in starts]
+
+    start, ende = seiten[-1]
+    y_ende = y_start - ZEILENABSTAND * (ende - start)
+    return seiten, y_ende < MIN_Y_SUMME
+
+def _draw_zeilen(c, zeilen, y, col_x):
+    """
+    Zeilen einer Seite in einem einzigen Textobjekt ausgeben:
+    feste relative Spaltenabstände statt einzelner ``drawString``-Aufrufe.
+    """
+    if not zeilen:
+        return
+    abstaende = [b - a for a, b in zip(col_x, col_x[1:])]
+    zurueck = col_x[0] - col_x[-1]
+
+    t = c.beginText(col_x[0], y)
+    t.setFont("Helvetica", 9)
+    for values in zeilen:
+        for v, dx in zip(values, abstaende):
+            t.textOut(v)
+            t.moveCursor(dx, 0)
+        t.textOut(values[-1])
+        t.moveCursor(zurueck, ZEILENABSTAND)
+    c.drawText(t)
+
+def _draw_block(c, width, height, mitarbeiter, teil, titel, summen_text):
+    """Tabelle eines Blocks inkl. vorab berechneter Seitenumbrüche und Summenzeile zeichnen."""
+    zeilen = _zeilen(teil)
+    seiten, summe_neue_seite = _seitenaufteilung(
+        len(zeilen), _tabellen_start_y(height, bool(titel))
+    )
+
+    for nr, (start, ende) in enumerate(seiten):
+        if nr:
+            c.showPage()
+        y, col_x = _draw_header(c, width, height, mitarbeiter, titel)
+        _draw_zeilen(c, zeilen[start:ende], y, col_x)
+    y -= ZEILENABSTAND * (ende - start)
+
+    # Summenzeile
+    if summe_neue_seite:
+        c.showPage()
+        y, col_x = _draw_header(c, width, height, mitarbeiter, titel)
+        y -= 10
+
+    y -= 5
+    c.line(40, y, width - 40, y)
+    y -= 15
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(40, y, summen_text)
+    c.drawString(col_x[5], y, format_cent(teil["_netto"].sum()))
+    c.drawString(col_x[6], y, format_cent(teil["_praemie"].sum()))
+
+def _zeilen(teil):
+    """Vorformatierte Tabellenzeilen eines Blocks als Tupel von Strings."""
+    return list(zip(*(teil[spalte].tolist() for spalte in ANZEIGE_SPALTEN)))
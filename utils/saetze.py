@@ -0,0 +1,262 @@
+import numpy as np
+import pandas as pd
+from utils.geld import euro_zu_cent, satz_skaliert
+from utils.parsing import parse_datum
+
+# Zielspalte → akzeptierte Spaltennamen in der Provisionstabelle (alle optional)
+SATZ_SPALTEN_ALIASE = {
+    "Gueltig_ab": ["Gültig ab", "Gueltig ab", "Gültig_ab", "Gueltig_ab"],
+    "Gueltig_bis": ["Gültig bis", "Gueltig bis", "Gültig_bis", "Gueltig_bis"],
+    "Umsatz_ab": ["Umsatz ab", "Umsatz_ab"],
+}
+
+# offene Grenzen (leeres Datum / keine Staffel) als Tageszahl bzw. Cent
+_UNBEGRENZT_UNTEN = np.iinfo(np.int64).min
+_UNBEGRENZT_OBEN = np.iinfo(np.int64).max
+
+
+class Satztabelle:
+    """
+    Provisionssätze je Mitarbeiter, optional zeitlich versioniert und gestaffelt.
+
+    Optionale Spalten der Provisionstabelle:
+      - ``Gültig ab`` / ``Gültig bis``: Gültigkeit der Zeile (jeweils
+        einschließlich, leer = unbegrenzt). Maßgeblich ist das Zahlungsdatum
+        der Rechnung, ohne Zahlungsdatum das Rechnungsdatum, sonst heute.
+      - ``Umsatz ab``: Staffel nach dem Nettobetrag der einzelnen Rechnung in €
+        (Gutschriften nach Betrag, kein kumulierter Umsatz); es gilt die
+        höchste erreichte Stufe.
+
+    Überschneiden sich gültige Zeilen eines Mitarbeiters, gilt die mit dem
+    spätesten ``Gültig ab``; endet sie, gilt wieder die vorherige. Ohne diese
+    Spalten bleibt jede Zeile ein eigener Eintrag mit festen Sätzen
+    (bisheriges Format, auch bei doppelten Namen).
+
+    Aufgelöst wird nicht je Rechnung, sondern je Kontext eines Mitarbeiters:
+    seine eigenen Gültigkeitswechsel und Staffelschwellen teilen Datum und
+    Betrag in Abschnitte, in denen seine Sätze konstant sind. Mitarbeiter mit
+    denselben Grenzen bilden ein ``Satzraster`` (ohne Gültigkeit und Staffeln
+    alle gemeinsam). Rechnungen werden je Raster per binärer Suche einem
+    Kontext zugeordnet (``Satzraster.kontexte``); die Staffel je (Mitarbeiter,
+    Kontext) wird über ``pd.merge_asof`` bestimmt. Der Aufwand wächst mit der
+    Summe der Kontexte je Mitarbeiter, nicht mit ihrem Produkt.
+    """
+
+    def __init__(self, provisionen):
+        provisionen = provisionen.rename(columns=_umbenennung(provisionen.columns))
+        provisionen = provisionen.reset_index(drop=True)
+        self.versioniert = any(spalte in provisionen.columns for spalte in SATZ_SPALTEN_ALIASE)
+
+        if "Mitarbeiter" in provisionen.columns:
+            namen = provisionen["Mitarbeiter"]
+        else:
+            namen = pd.Series([None] * len(provisionen), dtype=object)
+
+        if self.versioniert:
+            # Zeilen je Mitarbeiter zusammenfassen (Reihenfolge des ersten Auftretens)
+            gruppe, _ = pd.factorize(namen, use_na_sentinel=False)
+            self.mitarbeiter = namen[~namen.duplicated()].reset_index(drop=True)
+        else:
+            gruppe = np.arange(len(provisionen))
+            self.mitarbeiter = namen
+
+        if "Umsatz_ab" in provisionen.columns:
+            schwelle = euro_zu_cent(pd.to_numeric(provisionen["Umsatz_ab"], errors="coerce"))
+        else:
+            schwelle = np.zeros(len(provisionen), dtype=np.int64)
+
+        zeilen = pd.DataFrame({
+            "gruppe": gruppe.astype(np.int64),
+            "ab": _tage(provisionen, "Gueltig_ab", _UNBEGRENZT_UNTEN),
+            "bis": _tage(provisionen, "Gueltig_bis", _UNBEGRENZT_OBEN),
+            "schwelle": schwelle,
+            "eigen": satz_skaliert(_satz_spalte(provisionen, "Eigenleistung")),
+            "fremd": satz_skaliert(_satz_spalte(provisionen, "Fremdleistung")),
+        })
+        self.raster = self._aufloesen(zeilen)
+
+    def stichtage(self, rechnungen):
+        """Bezugstag je Rechnung für ``Satzraster.kontexte`` (``None`` ohne Datumsgrenzen)."""
+        if not any(len(raster.grenzen) for raster in self.raster):
+            return None
+        return _bezugstag(rechnungen)
+
+    def _aufloesen(self, zeilen):
+        """Sätze je Mitarbeiter und eigenem Kontext, zusammengefasst zu ``Satzraster``."""
+        anzahl = len(self.mitarbeiter)
+        if zeilen.empty:
+            return []
+
+        # eigene Datumsgrenzen und Staffelschwellen je Mitarbeiter
+        mit_ab = zeilen["ab"] != _UNBEGRENZT_UNTEN
+        mit_bis = zeilen["bis"] != _UNBEGRENZT_OBEN
+        grenzen = pd.concat([
+            pd.DataFrame({"gruppe": zeilen["gruppe"][mit_ab], "wert": zeilen["ab"][mit_ab]}),
+            pd.DataFrame({"gruppe": zeilen["gruppe"][mit_bis], "wert": zeilen["bis"][mit_bis] + 1}),
+        ])
+        schwellen = zeilen[["gruppe", "schwelle"]].rename(columns={"schwelle": "wert"})
+        grenzen_je = _je_gruppe(grenzen, anzahl)
+        schwellen_je = _je_gruppe(schwellen, anzahl)
+
+        anzahl_abschnitte = np.array([len(g) + 1 for g in grenzen_je], dtype=np.int64)
+        anzahl_stufen = np.array([len(s) + 1 for s in schwellen_je], dtype=np.int64)
+        anzahl_kontexte = anzahl_abschnitte * anzahl_stufen
+        beginn = np.cumsum(anzahl_kontexte) - anzahl_kontexte
+        satz_eigen = np.full(anzahl_kontexte.sum(), np.nan)
+        satz_fremd = satz_eigen.copy()
+
+        # Version = alle Staffelzeilen eines Mitarbeiters mit gleichem "Gültig ab"
+        zeilen["version"] = zeilen.groupby(["gruppe", "ab"], sort=False).ngroup().astype(np.int64)
+        versionen = (
+            zeilen.groupby("version", sort=False)
+            .agg(gruppe=("gruppe", "first"), ab=("ab", "first"), bis=("bis", "max"))
+            .reset_index()
+        )
+
+        # 1) je Mitarbeiter und eigenem Datumsabschnitt die gültige Version mit
+        #    dem spätesten "Gültig ab"
+        abschnitte = pd.DataFrame({
+            "gruppe": np.repeat(np.arange(anzahl, dtype=np.int64), anzahl_abschnitte),
+            "abschnitt": _laufende_nummer(anzahl_abschnitte),
+            "anfang": np.concatenate([np.append(_UNBEGRENZT_UNTEN, g) for g in grenzen_je]),
+        }).merge(versionen, on="gruppe")
+        gueltig = (abschnitte["ab"] <= abschnitte["anfang"]) & (
+            abschnitte["anfang"] <= abschnitte["bis"]
+        )
+        abschnitte = (
+            abschnitte[gueltig]
+            .sort_values("ab", kind="stable")
+            .drop_duplicates(["gruppe", "abschnitt"], keep="last")
+        )
+
+        # 2) je Version und eigener Betragsstufe die höchste erreichte Staffel
+        #    (as-of "Umsatz ab")
+        if not abschnitte.empty:
+            je_abschnitt = anzahl_stufen[abschnitte["gruppe"].to_numpy()]
+            stufen = abschnitte.loc[
+                abschnitte.index.repeat(je_abschnitt), ["gruppe", "abschnitt", "version"]
+            ]
+            stufen["stufe"] = _laufende_nummer(je_abschnitt)
+            betrag = np.concatenate([np.append(_UNBEGRENZT_UNTEN, s) for s in schwellen_je])
+            betrag_beginn = np.cumsum(anzahl_stufen) - anzahl_stufen
+            stufen["betrag"] = betrag[betrag_beginn[stufen["gruppe"].to_numpy()] + stufen["stufe"].to_numpy()]
+            stufen = pd.merge_asof(
+                stufen.sort_values("betrag", kind="stable"),
+                zeilen[["version", "schwelle", "eigen", "fremd"]].sort_values("schwelle", kind="stable"),
+                left_on="betrag", right_on="schwelle", by="version",
+            )
+
+            gruppe = stufen["gruppe"].to_numpy()
+            position = (
+                beginn[gruppe]
+                + stufen["abschnitt"].to_numpy() * anzahl_stufen[gruppe]
+                + stufen["stufe"].to_numpy()
+            )
+            satz_eigen[position] = stufen["eigen"].to_numpy(dtype=float)
+            satz_fremd[position] = stufen["fremd"].to_numpy(dtype=float)
+
+        # Mitarbeiter mit gleichen Grenzen und Schwellen teilen ein Raster
+        je_raster = {}
+        for gruppe, (g, s) in enumerate(zip(grenzen_je, schwellen_je)):
+            je_raster.setdefault((g.tobytes(), s.tobytes()), []).append(gruppe)
+        raster = []
+        for gruppen in je_raster.values():
+            gruppen = np.array(gruppen, dtype=np.int64)
+            erste = gruppen[0]
+            spalten = beginn[gruppen][:, None] + np.arange(anzahl_kontexte[erste])
+            raster.append(Satzraster(
+                gruppen, grenzen_je[erste], schwellen_je[erste],
+                satz_eigen[spalten], satz_fremd[spalten],
+            ))
+        return raster
+
+
+class Satzraster:
+    """
+    Mitarbeiter (Positionen in ``Satztabelle.mitarbeiter``) mit denselben
+    Datumsgrenzen und Staffelschwellen. ``satz_eigen``/``satz_fremd``: Sätze
+    (skaliert, NaN = kein Satz) als Matrix Mitarbeiter × Kontext.
+    """
+
+    def __init__(self, mitarbeiter, grenzen, schwellen, satz_eigen, satz_fremd):
+        self.mitarbeiter = mitarbeiter
+        self.grenzen = grenzen
+        self.schwellen = schwellen
+        self.satz_eigen = satz_eigen
+        self.satz_fremd = satz_fremd
+
+    @property
+    def anzahl_kontexte(self):
+        return self.satz_eigen.shape[1]
+
+    def kontexte(self, stichtage, netto_cent):
+        """Kontext (Spalte in ``satz_eigen``/``satz_fremd``) je Rechnung."""
+        stufe = np.searchsorted(self.schwellen, np.abs(netto_cent), side="right")
+        if not len(self.grenzen):
+            return stufe
+        abschnitt = np.searchsorted(self.grenzen, stichtage, side="right")
+        return abschnitt * (len(self.schwellen) + 1) + stufe
+
+
+def rechnungsklassen(netto_cent, ist_fremd):
+    """
+    Rechnungsklasse je Rechnung: 0/1 Eigenleistung positiv/negativ,
+    2/3 Fremdleistung positiv/negativ, -1 bei Netto 0 (nie provisionsrelevant).
+    Provision > 0 gilt genau dann, wenn Satz und Netto dasselbe Vorzeichen haben.
+    """
+    klasse = np.full(len(netto_cent), -1, dtype=np.int8)
+    klasse[(~ist_fremd) & (netto_cent > 0)] = 0
+    klasse[(~ist_fremd) & (netto_cent < 0)] = 1
+    klasse[ist_fremd & (netto_cent > 0)] = 2
+    klasse[ist_fremd & (netto_cent < 0)] = 3
+    return klasse
+
+
+def _umbenennung(vorhandene_spalten):
+    """Aliase der optionalen Spalten auf die Zielnamen abbilden (erster Treffer)."""
+    vorhanden = set(vorhandene_spalten)
+    umbenennung = {}
+    for ziel, aliase in SATZ_SPALTEN_ALIASE.items():
+        for name in aliase:
+            if name in vorhanden:
+                umbenennung[name] = ziel
+                break
+    return umbenennung
+
+
+def _je_gruppe(werte, anzahl):
+    """Sortierte, eindeutige ``wert`` je ``gruppe`` (0 … anzahl-1) als Liste von Arrays."""
+    werte = werte.drop_duplicates().sort_values(["gruppe", "wert"])
+    je_gruppe = np.bincount(werte["gruppe"].to_numpy(), minlength=anzahl)
+    return np.split(werte["wert"].to_numpy(dtype=np.int64), np.cumsum(je_gruppe)[:-1])
+
+
+def _laufende_nummer(laengen):
+    """0, 1, …, n-1 je Block der Länge ``laengen[i]``, aneinandergehängt."""
+    beginn = np.cumsum(laengen) - laengen
+    return np.arange(laengen.sum()) - np.repeat(beginn, laengen)
+
+
+def _tage(provisionen, spalte, leer):
+    """Datumsspalte als Tageszahl (int64); fehlend/leer → ``leer``."""
+    if spalte not in provisionen.columns:
+        return np.full(len(provisionen), leer, dtype=np.int64)
+    datum, _ = parse_datum(provisionen[spalte])
+    tage = datum.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(datum.isna().to_numpy(), leer, tage)
+
+
+def _bezugstag(rechnungen):
+    """Stichtag für die Satzgültigkeit je Rechnung als Tageszahl."""
+    datum = rechnungen["Zahlungsdatum"]
+    if "Rechnungsdatum" in rechnungen.columns:
+        datum = datum.fillna(rechnungen["Rechnungsdatum"])
+    datum = datum.fillna(pd.Timestamp.now().normalize())
+    return datum.to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+def _satz_spalte(provisionen, spalte):
+    """Provisionssätze einer Spalte als float-Array (fehlend → NaN)."""
+    if spalte not in provisionen.columns:
+        return np.full(len(provisionen), np.nan)
+    return pd.to_numeric(provisionen[spalte]).to_numpy(dtype=float)
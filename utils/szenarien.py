@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from utils.geld import cent_zu_euro, euro_zu_cent, provision_cent
+from utils.saetze import Satztabelle, rechnungsklassen
+
+
+def berechne_szenarien(rechnungen, szenarien, nur_bezahlt=True):
+    """
+    Provisionssummen je Mitarbeiter für mehrere Provisionstabellen auf einmal.
+
+    ``rechnungen``: normalisierte, bereits nach Zeitraum gefilterte Rechnungen
+    ``szenarien``: Name → Provisionstabelle (Format wie ``lese_provisionen``,
+    auch mit Gültigkeit/Staffeln)
+    ``nur_bezahlt``: nur bezahlte Rechnungen (Auszahlung), sonst inkl. Vorschau
+
+    Statt die Berechnung je Mitarbeiter zu wiederholen, werden die Rechnungen
+    je ``Satzraster`` einmal in Schlüssel (Kontext × Eigen/Fremd × Vorzeichen)
+    eingeteilt. Je Raster entsteht eine Summenmatrix Satzwert × Schlüssel der
+    je Rechnung gerundeten Provisionen (nur > 0); die Summe je Mitarbeiter ist
+    dann die Auswahl aus dieser Matrix über seine Satzmatrix. Die Beträge sind exakt
+    dieselben wie bei ``berechne_provisionen`` mit der jeweiligen Tabelle.
+
+    Rückgabe: je Mitarbeiter eine Zeile, je Szenario eine Spalte (Euro).
+    """
+    if nur_bezahlt:
+        rechnungen = rechnungen[rechnungen["Status"].astype(str) == "Bezahlt"]
+
+    if "Netto_Cent" in rechnungen.columns:
+        netto = rechnungen["Netto_Cent"].to_numpy(dtype=np.int64)
+    else:
+        netto = euro_zu_cent(rechnungen["Netto"])
+    ist_fremd = rechnungen["Ist_Fremdleistung"].to_numpy(dtype=bool)
+    klasse = rechnungsklassen(netto, ist_fremd)
+    relevant = klasse >= 0
+    netto_relevant = netto[relevant]
+
+    # je Rechnung gerundete Provision je Satzwert (über Raster und Szenarien gleich)
+    provision_je_satz = {}
+    spalten = {}
+    for name, provisionen in szenarien.items():
+        saetze = Satztabelle(provisionen)
+        stichtage = saetze.stichtage(rechnungen)
+        cent = np.zeros(len(saetze.mitarbeiter), dtype=np.int64)
+        for raster in saetze.raster:
+            anzahl_schluessel = raster.anzahl_kontexte * 4
+            schluessel = (raster.kontexte(stichtage, netto) * 4 + klasse)[relevant]
+
+            # maßgeblicher Satz je Mitarbeiter und Schlüssel
+            satz = np.empty((len(raster.mitarbeiter), anzahl_schluessel))
+            satz[:, 0::4] = raster.satz_eigen
+            satz[:, 1::4] = raster.satz_eigen
+            satz[:, 2::4] = raster.satz_fremd
+            satz[:, 3::4] = raster.satz_fremd
+            werte, satz_idx = np.unique(satz, return_inverse=True)
+
+            summen = np.zeros((len(werte), anzahl_schluessel), dtype=np.int64)
+            for i, wert in enumerate(werte):
+                if np.isnan(wert) or wert == 0:
+                    continue
+                provision = provision_je_satz.get(wert)
+                if provision is None:
+                    provision = provision_cent(netto_relevant, np.int64(wert))
+                    provision[provision < 0] = 0
+                    provision_je_satz[wert] = provision
+                summen[i] = np.bincount(
+                    schluessel, weights=provision, minlength=anzahl_schluessel
+                ).round().astype(np.int64)
+
+            cent[raster.mitarbeiter] = summen[
+                satz_idx.reshape(satz.shape), np.arange(anzahl_schluessel)
+            ].sum(axis=1)
+
+        spalten[name] = (
+            pd.Series(cent, index=pd.Index(saetze.mitarbeiter, name="Mitarbeiter"))
+            .groupby(level=0, sort=False)
+            .sum()
+        )
+
+    if not spalten:
+        return pd.DataFrame(columns=["Mitarbeiter"])
+
+    vergleich = pd.concat(spalten, axis=1).fillna(0).astype(np.int64)
+    for spalte in vergleich.columns:
+        vergleich[spalte] = cent_zu_euro(vergleich[spalte])
+    return vergleich.reset_index()
+
+
+def einheitliche_saetze(provisionen, eigenleistung, fremdleistung):
+    """Provisionstabelle mit denselben Mitarbeitern und einheitlichen Sätzen (in %)."""
+    mitarbeiter = provisionen["Mitarbeiter"].drop_duplicates().reset_index(drop=True)
+    return pd.DataFrame({
+        "Mitarbeiter": mitarbeiter,
+        "Eigenleistung": eigenleistung,
+        "Fremdleistung": fremdleistung,
+    })
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+class ZeitraumIndex:
+    """
+    Vorsortierter Datumsindex über normalisierte Rechnungen.
+
+    Bezahlte Rechnungen sind nach Zahlungsdatum, offene nach Rechnungsdatum
+    sortiert. Der Zeitraumfilter (Stichtag) ist damit eine binäre Suche statt
+    einer Maske über alle Zeilen; das Ergebnis entspricht
+    ``utils.logic.filtere_zeitraum`` (gleiche Zeilen, Eingangsreihenfolge).
+    """
+
+    def __init__(self, rechnungen):
+        self.rechnungen = rechnungen
+
+        ist_bezahlt = (rechnungen["Status"].astype(str) == "Bezahlt").to_numpy()
+        positionen = np.arange(len(rechnungen))
+
+        self._bezahlt_datum, self._bezahlt_pos = _sortiert(
+            rechnungen["Zahlungsdatum"], positionen, ist_bezahlt
+        )
+
+        if "Rechnungsdatum" in rechnungen.columns:
+            self._offen_datum, self._offen_pos = _sortiert(
+                rechnungen["Rechnungsdatum"], positionen, ~ist_bezahlt
+            )
+        else:
+            # ohne Rechnungsdatum zählen alle offenen Rechnungen
+            self._offen_datum = None
+            self._offen_pos = positionen[~ist_bezahlt]
+
+    def positionen(self, cutoff_date):
+        """Zeilenpositionen (aufsteigend) aller Rechnungen ab ``cutoff_date``."""
+        start = self._bezahlt_datum.searchsorted(cutoff_date, side="left")
+        teile = [self._bezahlt_pos[start:]]
+
+        if self._offen_datum is None:
+            teile.append(self._offen_pos)
+        else:
+            start = self._offen_datum.searchsorted(cutoff_date, side="left")
+            teile.append(self._offen_pos[start:])
+
+        return np.sort(np.concatenate(teile))
+
+    def filtern(self, cutoff_date):
+        """Rechnungen ab ``cutoff_date`` wie ``filtere_zeitraum``."""
+        return self.rechnungen.iloc[self.positionen(cutoff_date)]
+
+    @property
+    def bytes(self):
+        return int(
+            self.rechnungen.memory_usage(deep=True).sum()
+            + self._bezahlt_pos.nbytes
+            + self._offen_pos.nbytes
+            + self._bezahlt_datum.nbytes
+            + (self._offen_datum.nbytes if self._offen_datum is not None else 0)
+        )
+
+
+def _sortiert(datum, positionen, auswahl):
+    """Datum/Positionen der Auswahl nach Datum sortiert; NaT fällt heraus."""
+    datum = pd.DatetimeIndex(datum)
+    auswahl = auswahl & ~datum.isna()
+    werte = datum[auswahl]
+    pos = positionen[auswahl]
+    reihenfolge = np.argsort(werte.asi8, kind="stable")
+    return werte[reihenfolge], pos[reihenfolge]